@@ -1,6 +1,8 @@
 from classes.guess_tree import *
+from classes.exact_solver import ExactSolver
 from classes.results import *
 from utils.instance_utils import *
+from utils.games import LOADERS, list_games
 import argparse
 
 
@@ -11,41 +13,117 @@ def get_args():
 
     # Configs
     parser.add_argument('--game', type=str, default='wordle',
-                        choices=['wordle', 'mastermind', 'zoo'],
+                        choices=list(LOADERS),
                         help='Game instance to solve (default: wordle)')
+    parser.add_argument('--targets', type=str, default='data/solutions.txt',
+                        help='Wordle target word list; word length and alphabet follow the lists')
+    parser.add_argument('--guesses', type=str, default='data/non_solutions.txt',
+                        help='Wordle extra (non-target) guess word list')
     parser.add_argument('--cpu', action='store_true', help='Run on CPU only (disable GPU)')
+    parser.add_argument('--cpu_backend', type=str, default='numpy', choices=['numpy', 'numba', 'threads'],
+                        help='CPU scoring kernel: numpy, numba if installed, or threads (default: numpy)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Threads of the threads CPU kernel; above 1 it is also routed per node (default: 1)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for the feedback matrix and look-ahead candidates (default: 1)')
+    parser.add_argument('--parallel_build', action='store_true',
+                        help='Build independent child subtrees in --workers processes (CPU)')
     parser.add_argument('--hard_mode', action='store_true',
                         help='Enable Hard Mode constraints (Wordle only)')
-    parser.add_argument('--metric', type=int, default=1, choices=[0, 1, 2],
-                        help='Optimization metric: 0=Avg. Size, 1=Subtree-k, 2=Subtree-Full')
+    parser.add_argument('--metric', type=int, default=1, choices=[0, 1, 2, 3],
+                        help='Optimization metric: 0=Avg. Size, 1=Subtree-k, 2=Subtree-Full, 3=Exact (normal mode, CPU)')
+    parser.add_argument('--opener', type=str, default=None,
+                        help='Fixed first guess for the exact solver (metric 3)')
     parser.add_argument('--k', type=int, default=15,
                         help='Top-k candidates to evaluate (for metric 1)')
+    parser.add_argument('--horizon', type=int, default=0,
+                        help='Look-ahead depth for metrics 1/2; deeper nodes are estimated from partition sizes (default: 0 = full depth)')
+    parser.add_argument('--time_budget', type=float, default=None,
+                        help='Anytime build (metrics 1/2): start greedy and upgrade the largest nodes until this many seconds have passed')
+    parser.add_argument('--build_order', type=str, default='bfs', choices=['bfs', 'dfs'],
+                        help='Order of the serial build: bfs (queue) or dfs (stack, bounded memory); same tree (default: bfs)')
+    parser.add_argument('--stream_tree', type=str, default=None,
+                        help='Write the vertices of the serial build to this append-only file as they are created')
+    parser.add_argument('--checkpoint_every', type=float, default=0,
+                        help='Write a checkpoint of the build every this many seconds, 0 disables it (default: 0). '
+                             'Checkpoints are written between nodes only: work inside a node, including the root, '
+                             'is lost if the build stops before the node finishes')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the build from its last checkpoint')
+    parser.add_argument('--memo_mb', type=int, default=256,
+                        help='Memory budget (MB) of the look-ahead transposition table, 0 disables it (default: 256)')
     parser.add_argument('--score', type=str, default='PC', choices=['PC', 'WA', 'H'],
                         help='Score rule: PC=Partition Count, WA=Weighted Average, H=Entropy (default: PC)')
 
     # Flags
     parser.add_argument('--no_diagnosis', action='store_true', help='Disable diagnosis printing')
+    parser.add_argument('--list_games', action='store_true',
+                        help='List the available games and exit (no matrices are built)')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Rebuild the feedback matrix instead of using the on-disk cache')
     parser.add_argument('--no_evaluate', action='store_true', help='Skip evaluation step')
     parser.add_argument('--save_tree', action='store_true', help='Save the resulting tree to JSON')
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.time_budget is not None and args.metric not in (1, 2):
+        parser.error("--time_budget needs a look-ahead metric (--metric 1 or 2)")
+    if args.parallel_build and args.time_budget is not None:
+        parser.error("--parallel_build cannot be combined with --time_budget")
+    if (args.checkpoint_every or args.resume) and \
+            (args.time_budget is not None or args.parallel_build or args.metric == 3):
+        parser.error("checkpoints cover the serial BFS build (not --time_budget, --parallel_build or --metric 3)")
+    if args.build_order == 'dfs' and (args.time_budget is not None or args.parallel_build or args.metric == 3):
+        parser.error("--build_order dfs covers the serial build (not --time_budget, --parallel_build or --metric 3)")
+    if args.stream_tree and (args.time_budget is not None or args.parallel_build or args.metric == 3 or
+                             args.build_order == 'dfs' or args.checkpoint_every or args.resume):
+        parser.error("--stream_tree covers the serial BFS build (not --time_budget, --parallel_build, --metric 3, "
+                     "--build_order dfs or checkpoints)")
+    if args.cpu_backend == 'threads' and args.threads < 2:
+        parser.error("--cpu_backend threads needs --threads 2 or more")
+    if args.metric == 3 and args.hard_mode:
+        parser.error("the exact solver (--metric 3) supports normal mode only")
+    if args.metric == 3 and args.horizon:
+        parser.error("the exact solver (--metric 3) searches to full depth (no --horizon)")
+    if args.opener is not None and args.metric != 3:
+        parser.error("--opener needs the exact solver (--metric 3)")
+    return args
 
 
 def main():
     args = get_args()
 
+    if args.list_games:
+        for game in list_games():
+            print(game.summary())
+        return
+
     # Get flags and configs from args
     flags = {
         'print_diagnosis': not args.no_diagnosis,
+        'use_cache': not args.no_cache,
         'evaluate': not args.no_evaluate,
         'save_tree': args.save_tree
     }
     configs = {
         'GPU': not args.cpu,
+        'cpu_backend': args.cpu_backend,
+        'threads': args.threads,
+        'workers': args.workers,
+        'parallel_build': args.parallel_build,
         'game': args.game,
+        'targets_file': args.targets,
+        'guesses_file': args.guesses,
         'hard_mode': args.hard_mode,
         'metric': args.metric,
+        'opener': args.opener,
         'k': args.k,
+        'horizon': args.horizon,
+        'time_budget': args.time_budget,
+        'build_order': args.build_order,
+        'stream_tree': args.stream_tree,
+        'checkpoint_every': args.checkpoint_every,
+        'resume': args.resume,
+        'memo_bytes': args.memo_mb << 20,
         'score': args.score
     }
 
@@ -54,10 +132,13 @@ def main():
     # as the default when available.
     if args.game in ('mastermind', 'zoo'):
         configs['GPU'] = False
+    # The exact solver runs on the CPU
+    if args.metric == 3:
+        configs['GPU'] = False
 
     instance = get_instance(flags, configs)
 
-    gt = Guess_Tree(instance, flags, configs)
+    gt = (ExactSolver if args.metric == 3 else Guess_Tree)(instance, flags, configs)
     tree, D, runtime = gt.build_tree()
 
     results = Results(instance, flags, configs)
@@ -0,0 +1,193 @@
+import json
+import numpy as np
+
+
+# Must match Guess_Tree.LEAF_SENTINEL.
+LEAF_SENTINEL = -1
+
+
+class CompactTree:
+    """
+    Array-backed decision tree. Vertex v (0 = root) holds the guess
+    ``guesses[v]`` (LEAF_SENTINEL for a pure leaf) and was reached from
+    ``parents[v]`` by the feedback code ``codes[v]`` (-1 at the root).
+    Children are stored CSR-style: the children of v are
+    ``child_ids[child_offsets[v]:child_offsets[v + 1]]``, sorted by their
+    codes ``child_codes[...]``, so a child lookup is a binary search over
+    the branching of v
+
+    ``from_dict``/``to_dict`` convert from/to the dict form
+    {'root', 'vertices': [(v, guess)], 'successors': {(v_parent, code): v}}
+    and ``from_decoded``/``to_decoded`` from/to the saved JSON form, whose
+    guesses are words and whose edges are keyed by str((v_parent, feedback))
+    """
+    __slots__ = ('guesses', 'parents', 'codes', 'child_offsets', 'child_codes', 'child_ids', 'upgraded')
+
+    def __init__(self, guesses, parents, codes, upgraded=None, index=None):
+        """
+        ``index`` = (child_offsets, child_ids) skips building the CSR index
+        (see utils.tree_stream_utils, which stores it in the file)
+        """
+        self.guesses = np.asarray(guesses, dtype=np.int32).reshape(-1)
+        self.parents = np.asarray(parents, dtype=np.int32).reshape(-1)
+        self.codes = np.asarray(codes, dtype=np.int32).reshape(-1)
+        # Vertices upgraded to their look-ahead guess (anytime builds)
+        self.upgraded = upgraded
+
+        if index is not None:
+            self.child_offsets = np.asarray(index[0], dtype=np.int64)
+            self.child_ids = np.asarray(index[1], dtype=np.int32)
+            self.child_codes = self.codes[self.child_ids]
+            return
+        n = len(self.guesses)
+        child_ids = np.flatnonzero(self.parents >= 0)
+        child_ids = child_ids[np.lexsort((self.codes[child_ids], self.parents[child_ids]))]
+        self.child_ids = child_ids.astype(np.int32)
+        self.child_codes = self.codes[self.child_ids]
+        self.child_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parents[self.child_ids], minlength=n), out=self.child_offsets[1:])
+
+
+    def __len__(self):
+        return len(self.guesses)
+
+
+    def child(self, v, code):
+        """
+        Returns the child of v reached by feedback ``code``, or -1
+        """
+        start, end = self.child_offsets[v], self.child_offsets[v + 1]
+        i = start + np.searchsorted(self.child_codes[start:end], code)
+        if i < end and self.child_codes[i] == code:
+            return int(self.child_ids[i])
+        return -1
+
+
+    def child_many(self, vs, codes):
+        """
+        Vectorized ``child``: returns the child of vs[i] reached by feedback
+        codes[i] for every i, or -1. Edges are searched by the key
+        parent * stride + code, which the CSR order already sorts
+        """
+        vs, codes = np.asarray(vs, dtype=np.int64), np.asarray(codes, dtype=np.int64)
+        if not len(self.child_ids):
+            return np.full(len(vs), -1, dtype=np.int64)
+        stride = int(self.child_codes.max()) + 1
+        keys = self.parents[self.child_ids].astype(np.int64) * stride + self.child_codes
+        query = vs * stride + codes
+        i = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        found = (keys[i] == query) & (codes < stride)
+        return np.where(found, self.child_ids[i], -1)
+
+
+    def children(self, v):
+        """
+        Returns the (codes, ids) of the children of v, sorted by code
+        """
+        start, end = self.child_offsets[v], self.child_offsets[v + 1]
+        return self.child_codes[start:end], self.child_ids[start:end]
+
+
+    @classmethod
+    def from_dict(cls, tree):
+        n = len(tree['vertices'])
+        guesses = np.empty(n, dtype=np.int32)
+        parents = np.full(n, -1, dtype=np.int32)
+        codes = np.full(n, -1, dtype=np.int32)
+        for v, g in tree['vertices']:
+            guesses[int(v)] = int(g)
+        for (v_parent, code), v in tree['successors'].items():
+            parents[int(v)] = int(v_parent)
+            codes[int(v)] = int(code)
+        return cls(guesses, parents, codes, tree.get('upgraded'))
+
+
+    def to_dict(self):
+        tree = {
+            'root': 0,
+            'vertices': list(enumerate(self.guesses.tolist())),
+            'successors': {(p, c): v for v, (p, c) in enumerate(zip(self.parents.tolist(), self.codes.tolist()))
+                           if p >= 0},
+        }
+        if self.upgraded is not None:
+            tree['upgraded'] = list(self.upgraded)
+        return tree
+
+
+    @classmethod
+    def from_decoded(cls, decoded, words_map, decode_feedback, base):
+        """
+        Parses the JSON form once: words become guess indices and decoded
+        feedbacks become codes (through the decoding of every code < base)
+        """
+        word_to_idx = {w: i for i, w in enumerate(words_map)}
+        code_of = {str(tuple(decode_feedback(c).tolist())): c for c in range(base)}
+        n = len(decoded['vertices'])
+        guesses = np.empty(n, dtype=np.int32)
+        parents = np.full(n, -1, dtype=np.int32)
+        codes = np.full(n, -1, dtype=np.int32)
+        for v, word in decoded['vertices']:
+            guesses[v] = LEAF_SENTINEL if word is None else word_to_idx[word]
+        for key, v in decoded['successors'].items():
+            # key = str((v_parent, feedback_tuple))
+            v_parent, feedback = key[1:-1].split(", ", 1)
+            parents[v] = int(v_parent)
+            codes[v] = code_of[feedback]
+        return cls(guesses, parents, codes, decoded.get('upgraded'))
+
+
+    def write_decoded(self, f, words_map, decode_feedback, chunk=4096):
+        """
+        Writes the JSON form to the text file ``f`` in chunks of vertices,
+        byte-for-byte as json.dump(self.to_decoded(...)) but without
+        building the decoded tree in memory
+        """
+        guesses, parents, codes = self.guesses, self.parents, self.codes
+        words = [json.dumps(w) for w in words_map]
+        f.write('{"root": 0, "vertices": [')
+        for start in range(0, len(self), chunk):
+            f.write(("" if start == 0 else ", ") + ", ".join(
+                f"[{v}, {'null' if g == LEAF_SENTINEL else words[g]}]"
+                for v, g in enumerate(guesses[start:start + chunk].tolist(), start)))
+
+        feedbacks = {}
+        f.write('], "successors": {')
+        first = True
+        for start in range(0, len(self), chunk):
+            items = []
+            for v, (p, c) in enumerate(zip(parents[start:start + chunk].tolist(),
+                                           codes[start:start + chunk].tolist()), start):
+                if p < 0:
+                    continue
+                if c not in feedbacks:
+                    feedbacks[c] = tuple(decode_feedback(c).tolist())
+                items.append(f"{json.dumps(str((p, feedbacks[c])))}: {v}")
+            if items:
+                f.write(("" if first else ", ") + ", ".join(items))
+                first = False
+        f.write('}')
+
+        if self.upgraded is not None:
+            f.write(', "upgraded": ' + json.dumps(list(self.upgraded)))
+        f.write('}')
+
+
+    def to_decoded(self, words_map, decode_feedback):
+        """
+        Returns the JSON form, decoding each distinct feedback code once
+        """
+        decoded = {'root': 0, 'vertices': [], 'successors': {}}
+        for v, g in enumerate(self.guesses.tolist()):
+            decoded['vertices'].append((v, None if g == LEAF_SENTINEL else words_map[g]))
+
+        feedbacks = {}
+        for v, (p, c) in enumerate(zip(self.parents.tolist(), self.codes.tolist())):
+            if p < 0:
+                continue
+            if c not in feedbacks:
+                feedbacks[c] = tuple(decode_feedback(c).tolist())
+            decoded['successors'][str((p, feedbacks[c]))] = v
+
+        if self.upgraded is not None:
+            decoded['upgraded'] = list(self.upgraded)
+        return decoded
@@ -1,8 +1,9 @@
 from utils.xp_utils import cp, HAS_CUPY
+from utils.calibration_utils import (ROUTED_CPU_BACKENDS, CALIBRATION_N_T, CALIBRATION_N_G, CALIBRATION_POINT_SECONDS,
+                                     TRANSFER_SIZES, hardware_fingerprint, fit_cost_model, predict_cost,
+                                     fit_transfer_model, predict_transfer, load_calibration, save_calibration)
 import numpy as np
 import time
-import json
-import os
 
 
 class DeviceOptimizer:
@@ -10,7 +11,6 @@ class DeviceOptimizer:
         G, T, F, C, _, best_guess_fns, best_guesses_fns = instance
         self.flags = flags
         self.configs = configs
-        self.threshold = 0
 
         # If CuPy is unavailable, quietly force CPU mode so the rest of
         # the pipeline (Mastermind/Zoo and CPU-only Wordle builds) still works.
@@ -20,201 +20,218 @@ class DeviceOptimizer:
             configs['GPU'] = False
 
         # --- Solver References ---
-        # 0 = CPU, 1 = GPU
-        self.solvers_cpu = (best_guess_fns[0], best_guesses_fns[0])
-        self.solvers_gpu = (best_guess_fns[1], best_guesses_fns[1])
+        # Registries keyed by backend: 'cpu' (NumPy), 'gpu' and optional
+        # CPU backends such as 'numba' (present only if installed)
+        self.cpu_backend = configs.get('cpu_backend', 'numpy')
+        if self.cpu_backend == 'numpy':
+            self.cpu_backend = 'cpu'
+        if self.cpu_backend not in best_guess_fns:
+            if flags.get('print_diagnosis'):
+                print(f"  [DeviceOptimizer] {self.cpu_backend.capitalize()} not available; using NumPy CPU backend.")
+            self.cpu_backend = 'cpu'
+        self.solvers_cpu = (best_guess_fns[self.cpu_backend], best_guesses_fns[self.cpu_backend])
+        self.solvers_gpu = (best_guess_fns['gpu'], best_guesses_fns['gpu'])
+
+        # Routed backends: name -> (on GPU, (get_best_guess, get_best_guesses)).
+        # The configured CPU kernel, the multithreaded CPU kernels that are
+        # installed and the GPU if enabled; backends sharing a solver (the
+        # look-ahead metrics wrap them all) are routed once
+        self.backends = {self.cpu_backend: (False, self.solvers_cpu)}
+        for name in ROUTED_CPU_BACKENDS:
+            if name in best_guess_fns and \
+                    all(best_guess_fns[name] is not solvers[0] for _, solvers in self.backends.values()):
+                self.backends[name] = (False, (best_guess_fns[name], best_guesses_fns[name]))
+        if configs['GPU']:
+            self.backends['gpu'] = (True, self.solvers_gpu)
 
         # --- Data Management ---
         # Default to GPU if enabled
         self.xp = cp if configs['GPU'] else np
         self.F_gpu = F
         self.C_gpu = C
-        
+        self.n_guesses = len(G)
+
         # Run initialization
         self._initialize_data_and_calibration(T, G, F, C)
 
 
     def _initialize_data_and_calibration(self, T, G, F, C):
         """
-        Pre-loads CPU data and handles calibration logic (load/save/run)
+        Pre-loads CPU data and the cost models of the routed backends
+        (load/save/run)
         """
         if self.configs['GPU']:
             self.F_cpu = cp.asnumpy(F)
             self.C_cpu = cp.asnumpy(C) if C is not None else None
-            
-            # Unique key based on metric AND the specific solver function being used
-            k = f"_k{self.configs['k']}" if self.configs['metric'] == 1 else ""
-            solver_name = self.solvers_cpu[0].__name__
-            self.calibration_key = f"metric_{self.configs['metric']}{k}_{solver_name}"
-            self.calibration_file = "application/results/calibration.json"
-
-            cached_val = self._load_calibration()
-            
-            if cached_val is not None:
-                self.threshold = cached_val
-                if self.flags['print_diagnosis']:
-                    print(f"  [Calibration] Loaded threshold for '{self.calibration_key}': {self.threshold}")
-            else:
-                self.threshold = self._calibrate_threshold(T, G)
-                self._save_calibration(self.threshold)
+            self.G_gpu = cp.arange(len(G))
         else:
             self.F_cpu = F
             self.C_cpu = C
-            self.threshold = float('inf') # Always CPU
+            self.G_gpu = None
+        # The full guess set on each device (normal mode)
+        self.G_cpu = np.arange(len(G))
+
+        # A single backend needs no model
+        self.models = None
+        if len(self.backends) == 1:
+            return
+
+        # Unique key based on metric, score rule AND the backends being routed
+        k = f"_k{self.configs['k']}" if self.configs['metric'] == 1 else ""
+        solver_name = self.solvers_cpu[0].__name__.lstrip('_')
+        self.calibration_key = (f"metric_{self.configs['metric']}{k}_{self.configs.get('score', 'PC')}"
+                                f"_base{self.configs.get('base', 243)}_{np.dtype(self.F_cpu.dtype).name}"
+                                f"_{solver_name}_{'_'.join(self.backends)}")
+
+        self.models = load_calibration(self.calibration_key)
+        if self.models is not None:
+            if self.flags['print_diagnosis']:
+                print(f"  [Calibration] Loaded cost models for '{self.calibration_key}' "
+                      f"(hardware {hardware_fingerprint()[0]})")
+        else:
+            self.models = self._calibrate(len(T), len(G))
+            save_calibration(self.calibration_key, self.models)
 
 
     def get_context(self, T_curr, G_curr):
         """
-        Decides the optimal compute context (CPU vs GPU) for the given workload
+        Routes the node to the backend with the lowest predicted cost: its
+        fitted compute cost for (n_t, n_g), plus moving T (and the hard-mode
+        G) to its device
         Returns: (T, G, xp, F, C, get_best_guess, get_best_guesses)
         """
-        # Fast Exit: If we are already on CPU, stay there
-        if isinstance(T_curr, np.ndarray):
-            return (
-                T_curr, G_curr, np, 
-                self.F_cpu, self.C_cpu, 
-                self.solvers_cpu[0], self.solvers_cpu[1]
-            )
-
-        # Default: Use GPU
-        use_cpu = False
-        
-        # Measure Workload
-        n_t = len(T_curr) if hasattr(T_curr, '__len__') else 0
-        n_g = len(G_curr) if G_curr is not None and hasattr(G_curr, '__len__') else 0
-        workload = n_t * n_g
-
-        # Check Conditions
-        # If GPU enabled but workload is tiny, switch to CPU
-        if self.configs['GPU'] and self.configs['hard_mode'] and G_curr is not None:
-            if workload < self.threshold:
-                use_cpu = True
-                # Move data to CPU
-                T_curr = cp.asnumpy(T_curr)
-                G_curr = cp.asnumpy(G_curr)
+        on_gpu = not isinstance(T_curr, np.ndarray)
 
-        # Return Context
-        if use_cpu or not self.configs['GPU']:
-            return (
-                T_curr, G_curr, np, 
-                self.F_cpu, self.C_cpu, 
-                self.solvers_cpu[0], self.solvers_cpu[1]
-            )
+        if self.models is None:
+            name = self.cpu_backend
         else:
-            return (
-                T_curr, G_curr, cp, 
-                self.F_gpu, self.C_gpu, 
-                self.solvers_gpu[0], self.solvers_gpu[1]
-            )
+            n_t = len(T_curr)
+            n_g = len(G_curr) if G_curr is not None else self.n_guesses
+            n_moved = n_t + (n_g if self.configs['hard_mode'] and G_curr is not None else 0)
+            name = min(self.backends, key=lambda b: self._predict(b, n_t, n_g, n_moved, on_gpu))
+        to_gpu, (get_best_guess, get_best_guesses) = self.backends[name]
+
+        # Move the node's data to the chosen device. In normal mode G is the
+        # full guess set, which each device already holds
+        moves_G = G_curr is not None and self.configs['hard_mode']
+        if to_gpu and not on_gpu:
+            T_curr = cp.asarray(T_curr)
+            G_curr = cp.asarray(G_curr) if moves_G else G_curr
+        elif on_gpu and not to_gpu:
+            T_curr = cp.asnumpy(T_curr)
+            G_curr = cp.asnumpy(G_curr) if moves_G else G_curr
+        if G_curr is not None and not self.configs['hard_mode']:
+            G_curr = self.full_guesses(cp if to_gpu else np)
+
+        # Return Context
+        if to_gpu:
+            return T_curr, G_curr, cp, self.F_gpu, self.C_gpu, get_best_guess, get_best_guesses
+        return T_curr, G_curr, np, self.F_cpu, self.C_cpu, get_best_guess, get_best_guesses
+
+
+    def full_guesses(self, xp):
+        """
+        Returns the full guess set on the device of ``xp``
+        """
+        return self.G_cpu if xp is np else self.G_gpu
+
+
+    def _predict(self, name, n_t, n_g, n_moved, on_gpu):
+        cost = predict_cost(self.models[name], n_t, n_g)
+        to_gpu = self.backends[name][0]
+        if to_gpu != on_gpu:
+            cost += predict_transfer(self.models['transfer']['h2d' if to_gpu else 'd2h'], n_moved)
+        return cost
 
 
-    def _calibrate_threshold(self, T_full, G_full):
+    def _calibrate(self, n_T, n_G):
         """
-        Runs a race between CPU and GPU
-        Includes 'Blowout Rule' and 'Safety Brake' to exit early if CPU is winning
+        Times every routed backend on a grid of (n_t, n_g) samples of the
+        instance, with the data already on its device, and fits its cost
+        model (see utils.calibration_utils). A backend stops being timed
+        once a sample takes longer than CALIBRATION_POINT_SECONDS
         """
         if self.flags['print_diagnosis']:
-            print(f"  [Calibration] Calibrating CPU/GPU threshold for {self.calibration_key}...")
+            print(f"  [Calibration] Fitting cost models of {', '.join(self.backends)} for {self.calibration_key}...")
+        rng = np.random.default_rng(0)
 
         # Warm Up (JIT Compile) with tiny workload
-        warm_T, warm_G = np.arange(10), np.arange(50) 
-        self.solvers_cpu[0](warm_T, warm_G, self.F_cpu)
-        self.solvers_gpu[0](cp.array(warm_T), cp.array(warm_G), self.F_gpu)
-        cp.cuda.Stream.null.synchronize()
-
-        # Race Points
-        test_points = [(10, 50), (50, 1000), (250, 1000), (1000, 1000), (2000, 2500)]
-        best_threshold = float('inf')  # Default to CPU
-        found_crossover = False
-
-        for n_t, n_g in test_points:
-            # Safe slice
-            n_t = min(n_t, len(T_full))
-            n_g = min(n_g, len(G_full))
-            workload = n_t * n_g
-            
-            idxs_t = np.random.choice(len(T_full), n_t, replace=False)
-            idxs_g = np.random.choice(len(G_full), n_g, replace=False)
-
-            # Time CPU
-            start = time.time()
-            self.solvers_cpu[0](idxs_t, idxs_g, self.F_cpu)
-            dur_cpu = time.time() - start
-
-            # Time GPU (Include transfer!)
-            start = time.time()
-            self.solvers_gpu[0](cp.array(idxs_t), cp.array(idxs_g), self.F_gpu)
-            cp.cuda.Stream.null.synchronize()
-            dur_gpu = time.time() - start
+        warm_T, warm_G = np.arange(min(10, n_T)), np.arange(min(50, n_G))
+        for name in self.backends:
+            self._time_backend(name, warm_T, warm_G)
+
+        points = sorted({(min(n_t, n_T), min(n_g, n_G)) for n_t in CALIBRATION_N_T for n_g in CALIBRATION_N_G},
+                        key=lambda point: (point[0] * point[1], point))
+        samples = {name: [] for name in self.backends}
+        stopped = set()
+        for n_t, n_g in points:
+            idxs_t = np.sort(rng.choice(n_T, n_t, replace=False))
+            idxs_g = np.sort(rng.choice(n_G, n_g, replace=False))
+            times = {}
+            for name in self.backends:
+                if name in stopped:
+                    continue
+                times[name] = self._time_backend(name, idxs_t, idxs_g)
+                samples[name].append((n_t, n_g, times[name]))
+                if times[name] > CALIBRATION_POINT_SECONDS:
+                    stopped.add(name)
 
             if self.flags['print_diagnosis']:
-                print(f"    Workload {workload:8d} | CPU: {dur_cpu:.4f}s | GPU: {dur_gpu:.4f}s")
-
-            # --- Safety Brake (Timeout) ---
-            # If any test takes > 0.5s, stop testing. It's too heavy
-            if dur_cpu > 0.5 or dur_gpu > 0.5:
-                if self.flags['print_diagnosis']:
-                    print("    [Calibration] Test took too long. Stopping race.")
-                if dur_gpu < (dur_cpu * 0.9):
-                    best_threshold = workload
-                    found_crossover = True
-                break
-
-            # --- Blowout Rule (Early Exit) ---
-            # If GPU is >2x slower than CPU on a non-trivial task, stop
-            # We don't need to test larger workloads to know CPU wins
-            if dur_gpu > (dur_cpu * 2.0) and dur_cpu > 0.01:
-                if self.flags['print_diagnosis']:
-                    print("    [Calibration] CPU is >2x faster. Stopping race early.")
+                shown = " | ".join(f"{name}: {seconds:.4f}s" for name, seconds in times.items())
+                print(f"    n_t {n_t:5d} x n_g {n_g:5d} | {shown}")
+            if len(stopped) == len(self.backends):
                 break
 
-            # --- Crossover Check ---
-            # GPU must be at least 10% faster to justify the switch
-            if dur_gpu < (dur_cpu * 0.9):
-                best_threshold = workload
-                found_crossover = True
-                break
-        
-        # If we found a crossover at the very first (tiniest) point, GPU is always faster
-        if found_crossover and best_threshold == test_points[0][0] * test_points[0][1]:
-            best_threshold = 0
+        models = {name: fit_cost_model(backend_samples) for name, backend_samples in samples.items()}
+        if self.configs['GPU']:
+            models['transfer'] = self._calibrate_transfer()
 
         if self.flags['print_diagnosis']:
-            print(f"  [Calibration] Threshold set to {best_threshold} ops")
-            
-        return best_threshold
+            for name in self.backends:
+                c0, c1, c2, c3 = models[name]
+                print(f"  [Calibration] {name}: {c0 * 1e6:.1f}us + {c1 * 1e9:.3f}ns * n_t*n_g "
+                      f"+ {c2 * 1e9:.1f}ns * n_t + {c3 * 1e9:.1f}ns * n_g")
+        return models
 
 
-    def _load_calibration(self):
+    def _time_backend(self, name, idxs_t, idxs_g):
         """
-        Loads the calibration value from the JSON file if it exists
+        Returns the seconds one call of the backend takes (best of up to
+        three calls, for short ones)
         """
-        if not os.path.exists(self.calibration_file):
-            return None
-        
-        try:
-            with open(self.calibration_file, 'r') as f:
-                data = json.load(f)
-                return data.get(self.calibration_key)
-        except (json.JSONDecodeError, IOError):
-            return None
-
-
-    def _save_calibration(self, value):
+        to_gpu, (get_best_guess, _) = self.backends[name]
+        if to_gpu:
+            T, G, F = cp.asarray(idxs_t), cp.asarray(idxs_g), self.F_gpu
+            cp.cuda.Stream.null.synchronize()
+        else:
+            T, G, F = idxs_t, idxs_g, self.F_cpu
+
+        best, total = float('inf'), 0.0
+        for _ in range(3):
+            start = time.perf_counter()
+            get_best_guess(T, G, F)
+            if to_gpu:
+                cp.cuda.Stream.null.synchronize()
+            seconds = time.perf_counter() - start
+            best, total = min(best, seconds), total + seconds
+            if total > 0.05:
+                break
+        return best
+
+
+    def _calibrate_transfer(self):
         """
-        Saves the calibration value to the JSON file
+        Fits the host-to-device and device-to-host cost of an index array
         """
-        data = {}
-        if os.path.exists(self.calibration_file):
-            try:
-                with open(self.calibration_file, 'r') as f:
-                    data = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                data = {} 
-
-        data[self.calibration_key] = value
-
-        os.makedirs(os.path.dirname(self.calibration_file), exist_ok=True)
-        
-        with open(self.calibration_file, 'w') as f:
-            json.dump(data, f, indent=4)
\ No newline at end of file
+        h2d, d2h = [], []
+        for n in TRANSFER_SIZES:
+            host = np.arange(n)
+            start = time.perf_counter()
+            device = cp.asarray(host)
+            cp.cuda.Stream.null.synchronize()
+            h2d.append((n, time.perf_counter() - start))
+
+            start = time.perf_counter()
+            cp.asnumpy(device)
+            d2h.append((n, time.perf_counter() - start))
+        return {'h2d': fit_transfer_model(h2d), 'd2h': fit_transfer_model(d2h)}
@@ -0,0 +1,264 @@
+from classes.guess_tree import Guess_Tree
+from utils.guess_selection_utils import _iter_partition_counts_CPU, _get_distinct_guesses
+from utils.bound_utils import depth_lower_bound
+from collections import deque
+import numpy as np
+import time
+
+
+class ExactSolver(Guess_Tree):
+    """
+    Exact solver (metric 3, normal mode): minimizes the expected number of
+    guesses and certifies the optimum.
+
+    C(S), the least total number of guesses that identifies every target
+    of S, is found by depth-first branch-and-bound over target sets:
+    candidates are scored with the partition-count kernel and ordered by
+    the lower bound |S| + sum of the admissible bounds of their partitions
+    (utils.bound_utils), guesses inducing the same partition are collapsed
+    (``_get_distinct_guesses``), and a transposition table keyed by the
+    target set keeps exact values and proven lower bounds across searches.
+    The root is solved by iterative deepening on the cost bound: a search
+    under bound beta either returns C(S) <= beta exactly or proves a lower
+    bound > beta, which raises beta for the next iteration.
+
+    ``configs['opener']`` fixes the first guess; the subtrees below it are
+    then solved independently
+    """
+    def __init__(self, instance, flags, configs):
+        super().__init__(instance, flags, configs)
+        if configs['hard_mode']:
+            raise ValueError("The exact solver (metric 3) supports normal mode only.")
+
+        self.G_names = instance[0]
+        self.F = np.asarray(self.F)
+        self.G = np.asarray(self.G)
+        self.T = np.asarray(self.T)
+        # Bound with the real branching factor: the feedback codes that occur,
+        # less the solving code (Mastermind uses 13 of its 25 labels)
+        codes = np.unique(self.F)
+        if self.targets_have_self_id:
+            codes = codes[codes != self.F[self.T[0], self.G[self.T[0]]]]
+        self.branching = len(codes)
+        self.lb_table = np.array([0] + [depth_lower_bound(s, 1, self.branching, self.targets_have_self_id)[0]
+                                        for s in range(1, len(self.T) + 1)], dtype=np.int64)
+
+        # Transposition table: target-set bytes -> [lower bound, guess];
+        # the bound is exact once the guess is set
+        self.table = {}
+        self.opener = configs.get('opener')
+
+
+    def build_tree(self):
+        """
+        Solves the instance exactly and returns the optimal tree in the
+        format of Guess_Tree.build_tree
+        """
+        self.start_diagnosis()
+        start_time = time.time()
+        self.v_curr = -1
+
+        if self.opener is not None:
+            if self.opener not in self.G_names:
+                raise ValueError(f"Opener '{self.opener}' is not a valid guess.")
+            g = self.G_names.index(self.opener)
+            g_in_T = self.targets_have_self_id and g < len(self.T)
+            total = len(self.T)
+            for T_p in self._partition(self.T, g, g_in_T):
+                total += self._solve(T_p)
+            root_guess = (g, g_in_T)
+        else:
+            total = self._solve(self.T)
+            root_guess = None
+
+        self.tree, D = self._export_tree(root_guess)
+        self.stop_diagnosis()
+        runtime = time.time() - start_time
+
+        if self.flags['print_diagnosis']:
+            opener = f" with opener '{self.opener}'" if self.opener is not None else ""
+            print(f"\n  [Exact] Optimal total {total} guesses, expected {total / len(self.T):.4f}{opener} "
+                  f"| target sets searched: {self.v_curr + 1} | table entries: {len(self.table)}")
+        return self.tree, D, runtime
+
+
+    def _solve(self, S):
+        """
+        Returns C(S) by iterative deepening on the cost bound. The cost of
+        the greedy tree caps the bound: a search under it always succeeds
+        """
+        beta, step = self._lower_bound(S), 1
+        upper = self._greedy_cost(S)
+        while True:
+            value, exact = self._search(S, min(beta, upper))
+            if exact:
+                return value
+            beta, step = max(value, beta + step), step * 2
+
+
+    def _greedy_cost(self, S):
+        """
+        Total number of guesses of the greedy (partition-count) tree for S,
+        an upper bound on C(S). Built to full depth: beyond a horizon,
+        build_subtree estimates depths, which do not bound C(S)
+        """
+        if len(S) == 1:
+            return 1 if self.targets_have_self_id else 0
+        g, g_in_S = self.optimizer.solvers_cpu[0](S, self.G, self.F)
+        horizon, self.horizon = self.horizon, 0
+        try:
+            return int(self.build_subtree(S, self.G, g, g_in_S).sum())
+        finally:
+            self.horizon = horizon
+
+
+    def _search(self, S, beta):
+        """
+        Returns (C(S), True) if C(S) <= beta, else (lower bound > beta, False)
+        """
+        n = len(S)
+        if n == 1:
+            return (1 if self.targets_have_self_id else 0), True
+        if n == 2 and self.targets_have_self_id:
+            self.table[S.tobytes()] = [3, int(S[0])]
+            return 3, True
+
+        key = S.tobytes()
+        entry = self.table.get(key)
+        if entry is not None and entry[1] is not None:
+            return entry[0], True
+        lb = entry[0] if entry is not None else int(self.lb_table[n])
+        if lb > beta:
+            return lb, False
+        self.v_curr += 1
+
+        # Small sets: a guess of S that splits the rest into singletons meets the bound
+        if entry is None and self.targets_have_self_id and n <= self.branching + 1:
+            g = self._get_separating_target(S)
+            if g is not None:
+                self.table[key] = [lb, g]
+                return lb, True
+
+        candidates, cand_lb, cand_in_T = self._get_candidates(S)
+        # The best one-guess bound bounds S itself
+        if cand_lb[0] > lb:
+            lb = cand_lb[0]
+            if lb > beta:
+                self.table[key] = [lb, None]
+                return lb, False
+
+        best, best_g, fail_lb = None, None, None
+        for g, g_lb, g_in_T in zip(candidates, cand_lb, cand_in_T):
+            limit = beta if best is None else min(beta, best - 1)
+            if g_lb > limit:
+                # Candidates come sorted by bound: none of the rest can fit
+                fail_lb = g_lb if fail_lb is None else min(fail_lb, g_lb)
+                break
+
+            parts = sorted(self._partition(S, g, g_in_T), key=len, reverse=True)
+            part_lbs = [self._lower_bound(P) for P in parts]
+            acc, remaining = n, sum(part_lbs)
+            for P, P_lb in zip(parts, part_lbs):
+                remaining -= P_lb
+                value, exact = self._search(P, limit - acc - remaining)
+                acc += value
+                # Known exact values come back whatever the budget
+                if not exact or acc + remaining > limit:
+                    acc += remaining
+                    fail_lb = acc if fail_lb is None else min(fail_lb, acc)
+                    break
+            else:
+                best, best_g = acc, g
+
+        if best_g is not None:
+            self.table[key] = [best, int(best_g)]
+            return best, True
+
+        lb = max(lb, fail_lb if fail_lb is not None else lb)
+        self.table[key] = [lb, None]
+        return lb, False
+
+
+    def _get_candidates(self, S):
+        """
+        Returns the useful guesses for S (one per distinct partition, no
+        zero-information guesses) sorted by the lower bound of their cost,
+        with the bounds and in-S flags
+        """
+        n = len(S)
+        in_S = np.zeros(self.F.shape[1], dtype=bool)
+        if self.targets_have_self_id:
+            in_S[S] = True
+        G, in_T = _get_distinct_guesses(S, self.G, self.F, in_S[self.G].tolist())
+        in_T = np.asarray(in_T, dtype=bool)
+
+        cand_lb = np.empty(len(G), dtype=np.int64)
+        splits = np.empty(len(G), dtype=bool)
+        for start, end, counts in _iter_partition_counts_CPU(S, G, self.F, self.base):
+            cand_lb[start:end] = n + self.lb_table[counts].sum(axis=1)
+            splits[start:end] = counts.max(axis=1) < n
+        # A guess in S identifies itself: its own one-target partition costs nothing more
+        cand_lb -= in_T * self.lb_table[1]
+
+        keep = splits | in_T
+        G, cand_lb, in_T = G[keep], cand_lb[keep], in_T[keep]
+        order = np.argsort(cand_lb, kind='stable')
+        return G[order].tolist(), cand_lb[order].tolist(), in_T[order].tolist()
+
+
+    def _get_separating_target(self, S):
+        """
+        Returns a target of S whose feedbacks on S are all distinct, or None
+        """
+        block = np.sort(self.F[S[:, None], self.G[S]], axis=0)
+        separating = (block[1:] != block[:-1]).all(axis=0)
+        return int(S[separating.argmax()]) if separating.any() else None
+
+
+    def _partition(self, S, g, g_in_S):
+        return self._partition_by_feedback(S, g, g_in_S, self.F, np)[1]
+
+
+    def _lower_bound(self, S):
+        entry = self.table.get(S.tobytes())
+        return entry[0] if entry is not None else int(self.lb_table[len(S)])
+
+
+    def _export_tree(self, root_guess=None):
+        """
+        Builds the tree of optimal guesses from the table (BFS, same vertex
+        order and D convention as Guess_Tree.build_tree)
+        """
+        self._reset_tree()
+        queue = deque([(self.T, -1, None, 1)])
+        D = []
+        v_curr = -1
+
+        while queue:
+            S, v_parent, p_parent, depth = queue.popleft()
+            v_curr += 1
+
+            if len(S) == 1:
+                if self.targets_have_self_id:
+                    g = int(S[0])
+                    D.append(depth)
+                else:
+                    g = self.LEAF_SENTINEL
+                    D.append(max(0, depth - 1))
+                self.append2Tree(g, v_curr, v_parent, p_parent)
+                continue
+
+            if root_guess is not None:
+                g, g_in_S = root_guess
+                root_guess = None
+            else:
+                g = self.table[S.tobytes()][1]
+                g_in_S = self.targets_have_self_id and bool(np.any(S == g))
+            self.append2Tree(g, v_curr, v_parent, p_parent)
+            if g_in_S:
+                D.append(depth)
+
+            for p, S_p in zip(*self._partition_by_feedback(S, g, g_in_S, self.F, np)):
+                queue.append((S_p, v_curr, p, depth + 1))
+
+        return self._compact_tree(), np.array(D)
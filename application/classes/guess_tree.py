@@ -1,13 +1,25 @@
 from classes.device_optimizer import DeviceOptimizer
+from utils.feedback_utils import GuessFeedbackColumns
+from classes.transposition_table import TranspositionTable
+from classes.compact_tree import CompactTree
+from utils.bound_utils import depth_lower_bound, depth_lower_bound_levels
+from utils.parallel_utils import build_subtrees_parallel, BLOCKS_PER_WORKER
+from utils.checkpoint_utils import checkpoint_path, save_checkpoint, load_checkpoint, pack_ragged, unpack_ragged
+from utils.tree_stream_utils import TreeStreamWriter, read_tree_stream
 from collections import deque
+import heapq
 import numpy as np
 import threading
 import time
 import sys
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
 class Guess_Tree:
-    # Sentinel stored in tree['vertices'] for a "pure" leaf when the target
+    # Sentinel stored as the guess of a "pure" leaf when the target
     # has no self-id action (e.g., Zoo: guesses are attributes, never targets).
     LEAF_SENTINEL = -1
 
@@ -17,6 +29,8 @@ class Guess_Tree:
 
         # Solver State
         G, T, F, C, _, _, _ = instance
+        # Picklable instance data for the worker processes of parallel builds
+        self.instance_data = (G, T, F, C, None)
         self.xp = self.optimizer.xp
         self.G = self.xp.arange(len(G))
         self.T = self.xp.arange(len(T))
@@ -27,9 +41,34 @@ class Guess_Tree:
         # Whether every target also appears as a terminal guess action in G
         # (True for Wordle/Mastermind; False for Zoo where guesses are attributes).
         self.targets_have_self_id = bool(configs.get('targets_have_self_id', True))
-
-        # Tree Building State
-        self.tree = {'root': 0, 'vertices': [], 'successors': {}}
+        # Upper bound on feedback codes, i.e. on the branching of a node
+        self.base = int(configs.get('base', 243))
+        # Memo of greedy subtrees shared by the candidate builds (metrics 1/2)
+        memo_bytes = configs.get('memo_bytes', 0)
+        self.memo = TranspositionTable(memo_bytes) if memo_bytes and configs['metric'] in (1, 2) else None
+        # Look-ahead horizon: build_subtree estimates nodes deeper than this
+        # instead of expanding them (0 = build to the leaves)
+        self.horizon = int(configs.get('horizon', 0))
+        # Set on the look-ahead tree during anytime builds
+        self.deadline = None
+        # Checkpoint file of the serial build (set by build_tree)
+        self.checkpoint = None
+        self.checkpoint_writes = 0
+        self.checkpoint_bytes = 0
+        self.checkpoint_write_time = 0.0
+        # Transposition table [hits, misses] of --parallel_build workers
+        self.worker_memo_counts = [0, 0]
+        # Serial build order: 'bfs' (queue) or 'dfs' (stack, renumbered to BFS)
+        self.dfs = configs.get('build_order', 'bfs') == 'dfs'
+        self.peak_pending = 0
+        # Guess-vs-guess feedback columns for hard-mode filtering (computed lazily)
+        self.guess_columns = GuessFeedbackColumns(G) if configs['hard_mode'] else None
+
+        # Tree Building State: per vertex, its guess and the parent and
+        # feedback code of its incoming edge (frozen into a CompactTree),
+        # or the stream file they are appended to (--stream_tree)
+        self._reset_tree()
+        self.stream = None
         self._stop_diagnosis = False
         self._diagnosis_thread = None
         self.v_curr = -1
@@ -37,8 +76,18 @@ class Guess_Tree:
 
     def build_tree(self):
         """
-        Build tree iteratively using explicit queue (BFS)
+        Build tree iteratively using explicit queue (BFS), or stack (DFS)
+        with configs['build_order'] == 'dfs'. The DFS build holds at most
+        depth x branching pending nodes instead of a whole level, and its
+        vertices are renumbered to BFS order at the end, so both orders
+        return the same tree and D
         """
+        if self.configs.get('time_budget') is not None:
+            return self.build_tree_anytime(self.configs['time_budget'])
+        workers = self.configs.get('workers', 1)
+        if self.configs.get('parallel_build') and workers > 1 and not self.configs['GPU']:
+            return self.build_tree_parallel(workers)
+
         self.start_diagnosis()
         start_time = time.time()
 
@@ -46,10 +95,74 @@ class Guess_Tree:
         G_curr = self.G if self.configs['hard_mode'] else None
         queue = deque([(self.T, G_curr, -1, None, 1)])
         self.v_curr = -1
-        D = []
+        D, D_vertices = [], []
+        if self.configs.get('stream_tree'):
+            self.stream = TreeStreamWriter(self.configs['stream_tree'])
+
+        if self.configs.get('checkpoint_every') or self.configs.get('resume'):
+            self.checkpoint = checkpoint_path(self.configs, self.instance_data[1], self.instance_data[0])
+            if self.configs.get('resume'):
+                state = self._load_checkpoint()
+                if state is not None:
+                    queue, D, D_vertices, elapsed = state
+                    start_time -= elapsed
+            self.checkpoint_start = start_time
+            self.checkpoint_due = time.time() + self.configs.get('checkpoint_every', 0)
+
+        D, D_vertices = self._expand_queue(queue, D=D, D_vertices=D_vertices)
+        if self.dfs:
+            D = self._renumber_bfs(D, D_vertices)
+
+        self.stop_diagnosis()
+
+        runtime = time.time() - start_time
+        if self.checkpoint is not None:
+            # The build is complete: a later --resume starts over
+            self.checkpoint.unlink(missing_ok=True)
+            self.print_checkpoint_summary()
+        self.print_build_summary()
+        self.print_memo_summary()
+        return self._compact_tree(), np.array(D), runtime
+
+
+    def _reset_tree(self):
+        self.tree_guesses, self.tree_parents, self.tree_codes = [], [], []
+
+
+    def _compact_tree(self):
+        if self.stream is not None:
+            # The tree is on disk: finish the file and map it back
+            self.stream.close()
+            tree, _ = read_tree_stream(self.stream.path)
+            if self.flags['print_diagnosis']:
+                print(f"\n  [Stream] {len(tree)} vertices written to \"{self.stream.path}\"")
+            self.stream = None
+            return tree
+        return CompactTree(self.tree_guesses, self.tree_parents, self.tree_codes)
+
+
+    def _expand_queue(self, queue, max_depth=None, D=None, D_vertices=None):
+        """
+        Pops and expands the nodes of ``queue`` in BFS order (DFS order,
+        from the right end, with self.dfs), appending their vertices to
+        self.tree. With ``max_depth`` (BFS), nodes deeper than it are left in
+        the queue. Returns D and the vertex that recorded each entry
+        (extending ``D`` and ``D_vertices`` if given). Checkpoints, when
+        enabled, are written between nodes
+        """
+        D = [] if D is None else D
+        D_vertices = [] if D_vertices is None else D_vertices
+        checkpoint_every = self.configs.get('checkpoint_every')
+        pop = queue.pop if self.dfs else queue.popleft
 
         while queue:
-            T_curr, G_curr, v_parent, p_parent, depth = queue.popleft()
+            if max_depth is not None and queue[0][4] > max_depth:
+                break
+            if self.checkpoint is not None and checkpoint_every and time.time() >= self.checkpoint_due:
+                self._save_checkpoint(queue, D, D_vertices)
+                self.checkpoint_due = time.time() + checkpoint_every
+            self.peak_pending = max(self.peak_pending, len(queue))
+            T_curr, G_curr, v_parent, p_parent, depth = pop()
             self.v_curr += 1
 
             # Ask optimizer for context
@@ -70,57 +183,470 @@ class Guess_Tree:
                     # which is (depth - 1).
                     self.append2Tree(self.LEAF_SENTINEL, self.v_curr, v_parent, p_parent)
                     D.append(max(0, depth - 1))
+                D_vertices.append(self.v_curr)
                 continue
 
-            G_arg = G_curr if self.configs['hard_mode'] else self.G
+            G_arg = G_curr if self.configs['hard_mode'] else self.optimizer.full_guesses(xp)
             g_star, g_star_in_T = get_best_guess(T_curr, G_arg, F)
 
             self.append2Tree(g_star, self.v_curr, v_parent, p_parent)
             if g_star_in_T:
                 D.append(depth)
+                D_vertices.append(self.v_curr)
 
             # Partition candidates by feedback
             # Only strip g_star from T_curr if g_star is itself a target index
             # (guaranteed in Wordle and Mastermind; false for Zoo attribute queries).
-            if g_star_in_T:
-                T_curr = T_curr[T_curr != g_star]
-            feedbacks = F[T_curr, g_star]
-            unique_feedbacks, inverse_indices = xp.unique(feedbacks, return_inverse=True)
+            codes, parts = self._partition_by_feedback(T_curr, g_star, g_star_in_T, F, xp)
+            if self.dfs:
+                # Pushed last, popped first: children are visited by increasing code
+                codes, parts = codes[::-1], parts[::-1]
 
             # Expand children
-            for i, p in enumerate(unique_feedbacks):
-                T_p = T_curr[inverse_indices == i]
-                G_p = self.get_next_guesses_hardmode(T_p, G_curr, p, g_star, F, C)
-                queue.append((T_p, G_p, self.v_curr, p.item(), depth + 1))
+            for p, T_p in zip(codes, parts):
+                G_p = self.get_next_guesses_hardmode(T_p, G_curr, p, g_star, C)
+                queue.append((T_p, G_p, self.v_curr, p, depth + 1))
+
+        return D, D_vertices
+
+
+    def _renumber_bfs(self, D, D_vertices):
+        """
+        Renumbers the vertices of the tree into BFS order (level by level,
+        children by increasing feedback code, as the BFS build numbers them)
+        and returns D reordered to match
+        """
+        tree = self._compact_tree()
+        order = [0]
+        for v in order:
+            order.extend(tree.children(v)[1].tolist())
+        order = np.array(order)
+        new_id = np.empty(len(order), dtype=np.int64)
+        new_id[order] = np.arange(len(order))
+
+        parents = tree.parents[order]
+        self.tree_guesses = tree.guesses[order].tolist()
+        self.tree_parents = np.where(parents >= 0, new_id[parents], -1).tolist()
+        self.tree_codes = tree.codes[order].tolist()
+        D_order = np.argsort(new_id[np.asarray(D_vertices, dtype=np.int64)], kind='stable')
+        return np.asarray(D)[D_order].tolist()
+
+
+    def _save_checkpoint(self, queue, D, D_vertices):
+        """
+        Writes the build state (queue, partial tree, D, memo) to
+        self.checkpoint (see utils.checkpoint_utils)
+        """
+        write_start = time.time()
+        nodes = list(queue)
+        T_values, T_offsets = pack_ragged([T for T, *_ in nodes], dtype=np.int32)
+        G_values, G_offsets = pack_ragged([G for _, G, *_ in nodes if G is not None], dtype=np.int32)
+        arrays = {
+            'queue_T_values': T_values,
+            'queue_T_offsets': T_offsets,
+            'queue_G_values': G_values,
+            'queue_G_offsets': G_offsets,
+            'queue_has_G': np.array([G is not None for _, G, *_ in nodes], dtype=bool),
+            'queue_v_parent': np.array([v_parent for _, _, v_parent, _, _ in nodes], dtype=np.int64),
+            'queue_p_parent': np.array([-1 if p is None else p for _, _, _, p, _ in nodes], dtype=np.int64),
+            'queue_depth': np.array([depth for *_, depth in nodes], dtype=np.int64),
+            'tree_guesses': np.array(self.tree_guesses, dtype=np.int32),
+            'tree_parents': np.array(self.tree_parents, dtype=np.int32),
+            'tree_codes': np.array(self.tree_codes, dtype=np.int32),
+            'D': np.array(D, dtype=np.int64),
+            'D_vertices': np.array(D_vertices, dtype=np.int64),
+            'v_curr': np.int64(self.v_curr),
+            'elapsed': np.float64(time.time() - self.checkpoint_start),
+        }
+        memo = getattr(self.optimizer.solvers_cpu[0], 'memo', None)
+        if memo is not None:
+            arrays.update(memo.export())
+
+        self.checkpoint_bytes = save_checkpoint(self.checkpoint, arrays)
+        self.checkpoint_writes += 1
+        self.checkpoint_write_time += time.time() - write_start
+
+
+    def _load_checkpoint(self):
+        """
+        Restores the partial tree and memo from self.checkpoint. Returns
+        (queue, D, D_vertices, elapsed seconds), or None if there is none
+        """
+        arrays = load_checkpoint(self.checkpoint)
+        if arrays is None:
+            if self.flags['print_diagnosis']:
+                print(f"\n  [Checkpoint] No checkpoint at \"{self.checkpoint}\", starting a new build")
+            return None
+
+        Ts = unpack_ragged(arrays['queue_T_values'].astype(np.int64), arrays['queue_T_offsets'])
+        # Nodes with at most two targets carry no G (see get_next_guesses_hardmode)
+        Gs = iter(unpack_ragged(arrays['queue_G_values'].astype(np.int64), arrays['queue_G_offsets']))
+        queue = deque()
+        for T, has_G, v_parent, p_parent, depth in zip(Ts, arrays['queue_has_G'].tolist(),
+                                                       arrays['queue_v_parent'].tolist(),
+                                                       arrays['queue_p_parent'].tolist(),
+                                                       arrays['queue_depth'].tolist()):
+            G = self.xp.asarray(next(Gs)) if has_G else None
+            queue.append((self.xp.asarray(T), G, v_parent, None if p_parent < 0 else p_parent, depth))
+
+        self.tree_guesses = arrays['tree_guesses'].tolist()
+        self.tree_parents = arrays['tree_parents'].tolist()
+        self.tree_codes = arrays['tree_codes'].tolist()
+        self.v_curr = int(arrays['v_curr'])
+        memo = getattr(self.optimizer.solvers_cpu[0], 'memo', None)
+        if memo is not None and 'memo_keys' in arrays:
+            memo.restore(arrays)
+
+        elapsed = float(arrays['elapsed'])
+        if self.flags['print_diagnosis']:
+            print(f"\n  [Checkpoint] Resumed from \"{self.checkpoint}\": {self.v_curr + 1} vertices built, "
+                  f"{len(queue)} nodes queued, {elapsed:.0f}s elapsed")
+        return queue, arrays['D'].tolist(), arrays['D_vertices'].tolist(), elapsed
+
+
+    def build_tree_parallel(self, workers):
+        """
+        Parallel build (CPU): expands the top levels here, one level at a
+        time, until the frontier holds a few nodes per worker, then builds
+        the subtree of every frontier node in a process pool. Subtrees are
+        independent, so stitching them back in BFS order (see
+        ``_stitch_subtrees``) gives exactly the serial tree
+        """
+        self.start_diagnosis()
+        start_time = time.time()
+
+        G_curr = self.G if self.configs['hard_mode'] else None
+        queue = deque([(self.T, G_curr, -1, None, 1)])
+        self.v_curr = -1
+        D, max_depth = [], 1
+        while queue:
+            D += self._expand_queue(queue, max_depth)[0]
+            if len(queue) >= workers * BLOCKS_PER_WORKER:
+                break
+            max_depth += 1
+
+        # The candidate pool of the top levels is done: release its workers
+        # before the subtree pool starts its own
+        solver = self.optimizer.solvers_cpu[0]
+        pool = getattr(solver, 'pool', None)
+        if pool is not None:
+            self.worker_memo_counts = [c + p for c, p in zip(self.worker_memo_counts, pool.memo_counts)]
+            solver.close_pool()
+
+        frontier = list(queue)
+        if frontier:
+            tasks = [(T_p, G_p, depth) for T_p, G_p, _, _, depth in frontier]
+            subtrees, memo_counts = build_subtrees_parallel(self.instance_data, self.flags, self.configs, self.base,
+                                                            workers, tasks, on_done=self._count_subtree_vertices)
+            self.worker_memo_counts = [c + w for c, w in zip(self.worker_memo_counts, memo_counts)]
+            D += self._stitch_subtrees(frontier, subtrees)
 
         self.stop_diagnosis()
 
         runtime = time.time() - start_time
-        return self.tree, np.array(D), runtime
+        self.print_memo_summary()
+        return self._compact_tree(), np.array(D), runtime
 
 
-    def build_subtree(self, g_start, g_start_in_T):
+    def build_branch(self, T, G, depth):
+        """
+        Builds the subtree below a node with targets T (and allowed guesses G
+        in hard mode) at ``depth``, as flat lists over its local BFS vertex
+        ids: guesses, parent ids (-1 at the root), incoming feedbacks (-1 at
+        the root), and the D entries with their vertices
+        """
+        self._reset_tree()
+        self.v_curr = -1
+        D, D_vertices = self._expand_queue(deque([(T, G, -1, None, depth)]))
+        return self.tree_guesses, self.tree_parents, self.tree_codes, D, D_vertices
+
+
+    def _count_subtree_vertices(self, subtree):
+        self.v_curr += len(subtree[0])
+
+
+    def _stitch_subtrees(self, frontier, subtrees):
+        """
+        Appends the subtrees built from the frontier nodes to the tree and
+        returns their D. Vertex ids continue the serial BFS order: level by
+        level, and within a level in frontier order, then local order
+        """
+        v_next = len(self.tree_guesses)
+        levels = []
+        for guesses, parents, _, _, _ in subtrees:
+            level = [0] * len(guesses)
+            for v in range(1, len(guesses)):
+                level[v] = level[parents[v]] + 1
+            levels.append(level)
+
+        # Global ids: BFS order is level-sorted, so each subtree's vertices of
+        # a level are contiguous in its local order
+        ids = [[0] * len(guesses) for guesses, *_ in subtrees]
+        starts = [0] * len(subtrees)
+        depth = 0
+        while any(start < len(level) for start, level in zip(starts, levels)):
+            for i, level in enumerate(levels):
+                v = starts[i]
+                while v < len(level) and level[v] == depth:
+                    ids[i][v] = v_next
+                    v_next += 1
+                    v += 1
+                starts[i] = v
+            depth += 1
+
+        vertices, D = [], []
+        for (_, _, v_parent, p_parent, _), (guesses, parents, feedbacks, D_sub, D_vertices), ids_sub in \
+                zip(frontier, subtrees, ids):
+            for v, g in enumerate(guesses):
+                edge = (v_parent, p_parent) if v == 0 else (ids_sub[parents[v]], feedbacks[v])
+                vertices.append((ids_sub[v], g) + edge)
+            D += [(ids_sub[v], d) for v, d in zip(D_vertices, D_sub)]
+
+        vertices.sort()
+        D.sort()
+        for _, g, v_parent, p in vertices:
+            self.tree_guesses.append(g)
+            self.tree_parents.append(v_parent)
+            self.tree_codes.append(p)
+        self.v_curr = v_next - 1
+        return [d for _, d in D]
+
+
+    def build_tree_anytime(self, time_budget):
+        """
+        Anytime build (metric >= 1): starts from the greedy tree, then
+        upgrades nodes to the look-ahead choice, largest target sets first,
+        until ``time_budget`` seconds have passed. The tree is complete after
+        every step, and an upgrade is kept only if it lowers the score of the
+        node's subtree. The deadline is checked between upgrades and inside
+        the look-ahead candidate builds, which give up on it (a node whose
+        first candidate cannot finish keeps its greedy guess). The upgraded
+        vertices are returned in tree.upgraded
+        """
+        self.start_diagnosis()
+        start_time = time.time()
+        deadline = start_time + time_budget
+
+        # Node store: id -> [T, G, depth, guess, guess_in_T, children, parent, p]
+        self.nodes = {}
+        self._next_node = 0
+        G_root = self.G if self.configs['hard_mode'] else None
+        self.root = self._build_greedy_nodes(self.T, G_root, 1)
+
+        lookahead = self.optimizer.solvers_cpu[0].subtree
+        lookahead.deadline = deadline
+        heap = [(-len(self.T), self.root)]
+        upgraded, visited = [], 0
+        while heap and time.time() < deadline:
+            _, v = heapq.heappop(heap)
+            if v not in self.nodes:
+                continue  # replaced by an upgrade above it
+            visited += 1
+            T_v, G_v, depth, guess = self.nodes[v][:4]
+
+            T_v, G_v, xp, F, C, get_best_guess, _ = self.optimizer.get_context(T_v, G_v)
+            G_arg = G_v if self.configs['hard_mode'] else self.optimizer.full_guesses(xp)
+            g_star, g_star_in_T = get_best_guess(T_v, G_arg, F)
+            if time.time() >= deadline:
+                break  # the look-ahead choice may be incomplete
+
+            if int(g_star) != guess:
+                new = self._build_greedy_nodes(T_v, G_v, depth, (g_star, g_star_in_T))
+                if self._subtree_score(new) < self._subtree_score(v):
+                    self._replace_node(v, new)
+                    upgraded.append(new)
+                    v = new
+                else:
+                    self._remove_nodes(new)
+
+            for child in self.nodes[v][5].values():
+                n_child = len(self.nodes[child][0])
+                if n_child > (2 if self.targets_have_self_id else 1):
+                    heapq.heappush(heap, (-n_child, child))
+
+        lookahead.deadline = None
+        self.tree, D, ids = self._export_nodes()
+        self.upgraded = sorted(ids[u] for u in upgraded if u in ids)
+        self.tree.upgraded = self.upgraded
+        self.stop_diagnosis()
+
+        if self.flags['print_diagnosis']:
+            shown = ", ".join(str(v) for v in self.upgraded[:20])
+            more = ", ..." if len(self.upgraded) > 20 else ""
+            print(f"\n  [Anytime] Upgraded {len(self.upgraded)} of {visited} visited nodes "
+                  f"({len(heap)} left in queue): vertices [{shown}{more}]")
+
+        runtime = time.time() - start_time
+        self.print_memo_summary()
+        return self.tree, D, runtime
+
+
+    def _build_greedy_nodes(self, T, G, depth, start=None):
+        """
+        Builds the greedy subtree for targets T into the node store (BFS),
+        with guess ``start`` = (g, g_in_T) at its root. Returns the root id
+        """
+        greedy = self.optimizer.solvers_cpu[0].subtree.optimizer
+        queue = deque([(T, G, depth, None, None)])
+        root = None
+
+        while queue:
+            T_curr, G_curr, depth, parent, p = queue.popleft()
+            v = self._next_node
+            self._next_node += 1
+            self.v_curr = len(self.nodes)
+            if parent is None:
+                root = v
+            else:
+                self.nodes[parent][5][p] = v
+
+            T_curr, G_curr, xp, F, C, get_best_guess, _ = greedy.get_context(T_curr, G_curr)
+            node = [T_curr, G_curr, depth, None, False, {}, parent, p]
+            self.nodes[v] = node
+
+            if len(T_curr) == 1 and start is None:
+                if self.targets_have_self_id:
+                    node[3], node[4] = int(T_curr[0]), True
+                else:
+                    node[3] = self.LEAF_SENTINEL
+                continue
+
+            if start is not None:
+                g_star, g_star_in_T = start
+                start = None
+            else:
+                G_arg = G_curr if self.configs['hard_mode'] else greedy.full_guesses(xp)
+                g_star, g_star_in_T = get_best_guess(T_curr, G_arg, F)
+            node[3], node[4] = int(g_star), bool(g_star_in_T)
+
+            codes, parts = self._partition_by_feedback(T_curr, g_star, g_star_in_T, F, xp)
+            for p, T_p in zip(codes, parts):
+                G_p = self.get_next_guesses_hardmode(T_p, G_curr, p, g_star, C)
+                queue.append((T_p, G_p, depth + 1, v, p))
+
+        return root
+
+
+    def _subtree_nodes(self, v):
+        stack, out = [v], []
+        while stack:
+            u = stack.pop()
+            out.append(u)
+            stack.extend(self.nodes[u][5].values())
+        return out
+
+
+    def _subtree_score(self, v):
+        """
+        D.mean() + 0.001 * D.max() over the targets below node v
+        """
+        D = []
+        for u in self._subtree_nodes(v):
+            _, _, depth, guess, guess_in_T = self.nodes[u][:5]
+            if guess_in_T:
+                D.append(depth)
+            elif guess == self.LEAF_SENTINEL:
+                D.append(max(0, depth - 1))
+        D = np.array(D)
+        return D.mean() + 0.001 * D.max()
+
+
+    def _replace_node(self, v, new):
+        parent, p = self.nodes[v][6], self.nodes[v][7]
+        self._remove_nodes(v)
+        self.nodes[new][6], self.nodes[new][7] = parent, p
+        if parent is None:
+            self.root = new
+        else:
+            self.nodes[parent][5][p] = new
+
+
+    def _remove_nodes(self, v):
+        for u in self._subtree_nodes(v):
+            del self.nodes[u]
+
+
+    def _export_nodes(self):
+        """
+        Returns the node store as a tree in the format of build_tree (BFS
+        vertex order), its depths D and the map node id -> vertex
+        """
+        guesses, parents, codes = [], [], []
+        D, ids = [], {}
+        queue = deque([self.root])
+        while queue:
+            u = queue.popleft()
+            ids[u] = len(ids)
+            _, _, depth, guess, guess_in_T, children, parent, p = self.nodes[u]
+            guesses.append(guess)
+            parents.append(-1 if parent is None else ids[parent])
+            codes.append(-1 if parent is None else p)
+            if guess_in_T:
+                D.append(depth)
+            elif guess == self.LEAF_SENTINEL:
+                D.append(max(0, depth - 1))
+            queue.extend(children.values())
+        return CompactTree(guesses, parents, codes), np.array(D), ids
+
+
+    def build_subtree(self, T, G, g_start, g_start_in_T, bound=float('inf')):
         """
         Build subtree iteratively using explicit queue (BFS)
-        Used by the optimization strategy to evaluate candidates
+        Used by the optimization strategy to evaluate candidates: the greedy
+        subtree below guess ``g_start`` for targets T and allowed guesses G.
+        Only reads the instance (and the memo), so any process holding the
+        same instance returns the same D
+
+        Returns the depths D, or None as soon as an admissible lower bound on
+        D.mean() + 0.001 * D.max() exceeds ``bound`` (the incumbent score),
+        or once self.deadline (anytime builds) has passed
+
+        Greedy nodes go through the transposition table: a known subtree is
+        not expanded again, a known guess is not scored again
         """
         # Queue: (T_curr, G_curr, v_parent, p_parent, depth)
-        G_curr = self.G if self.configs['hard_mode'] else None
-        queue = deque([(self.T, G_curr, -1, None, 1)])
-        self.v_curr = -1
+        G_curr = G if self.configs['hard_mode'] else None
+        queue = deque([(T, G_curr, -1, None, 1)])
+        v_curr = -1
         D = []
 
+        # Per vertex: parent, depth and memo key (None if not memoized);
+        # per entry of D: the vertex that produced it
+        parents, depths, keys, owners = [], [], [], []
+
+        # Running bound: exact depths so far plus the lower bounds of the
+        # queued nodes
+        n = len(T)
+        lb_sum, lb_max = self._depth_lower_bound(n, 1)
+
         while queue:
+            if self.deadline is not None and time.time() > self.deadline:
+                return None
             T_curr, G_curr, v_parent, p_parent, depth = queue.popleft()
-            self.v_curr += 1
+            v_curr += 1
+            lb_sum -= self._depth_lower_bound(len(T_curr), depth)[0]
 
             # Ask optimizer for context
             T_curr, G_curr, xp, F, C, get_best_guess, _ = self.optimizer.get_context(T_curr, G_curr)
+            parents.append(v_parent)
+            depths.append(depth)
+            keys.append(None)
 
             # Leaf case for games without self-id actions (Zoo): pure leaf.
             # Cost is the number of queries on the root-to-leaf path = depth - 1.
             if (len(T_curr) == 1 and not self.targets_have_self_id and g_start is None):
                 D.append(max(0, depth - 1))
+                owners.append(v_curr)
+                lb_sum += D[-1]
+                continue
+
+            # Beyond the horizon: partition-size estimate of the node's depths
+            # (the level fill of its lower bound, already counted in lb_sum)
+            if self.horizon and depth > self.horizon and g_start is None:
+                for cost, k in depth_lower_bound_levels(len(T_curr), depth, self.base, self.targets_have_self_id):
+                    D.extend([cost] * k)
+                owners.extend([v_curr] * len(T_curr))
+                lb_sum += self._depth_lower_bound(len(T_curr), depth)[0]
                 continue
 
             # Get best guess considering starting guess
@@ -128,11 +654,35 @@ class Guess_Tree:
                 g_star, g_star_in_T = g_start, g_start_in_T
                 g_start = None
             else:
-                G_arg = G_curr if self.configs['hard_mode'] else self.G
-                g_star, g_star_in_T = get_best_guess(T_curr, G_arg, F)
+                key = entry = None
+                if self.memo is not None and len(T_curr) > 2:
+                    key = self.memo.key(T_curr, G_curr)
+                    entry = self.memo.get(key)
+
+                if entry is not None and entry[2] is not None:
+                    # Known subtree: take its depths without expanding it
+                    D_sub = entry[2] + (depth - 1)
+                    D.extend(D_sub.tolist())
+                    owners.extend([v_curr] * len(D_sub))
+                    lb_sum += int(D_sub.sum())
+                    lb_max = max(lb_max, int(D_sub.max()))
+                    if lb_sum / n + 0.001 * lb_max > bound:
+                        return None
+                    continue
+
+                if entry is not None:
+                    g_star, g_star_in_T = entry[0], entry[1]
+                else:
+                    G_arg = G_curr if self.configs['hard_mode'] else self.optimizer.full_guesses(xp)
+                    g_star, g_star_in_T = get_best_guess(T_curr, G_arg, F)
+                    if key is not None:
+                        self.memo.put(key, g_star, g_star_in_T)
+                keys[-1] = key
 
             if g_star_in_T:
                 D.append(depth)
+                owners.append(v_curr)
+                lb_sum += depth
 
             # Stop condition
             if len(T_curr) == 1:
@@ -141,39 +691,98 @@ class Guess_Tree:
             # Partition candidates by feedback
             # Only strip g_star from T_curr if g_star is itself a target index
             # (guaranteed in Wordle and Mastermind; false for Zoo attribute queries).
-            if g_star_in_T:
-                T_curr = T_curr[T_curr != g_star]
-            feedbacks = F[T_curr, g_star]
-            unique_feedbacks, inverse_indices = xp.unique(feedbacks, return_inverse=True)
+            codes, parts = self._partition_by_feedback(T_curr, g_star, g_star_in_T, F, xp)
 
             # Expand children
-            for i, p in enumerate(unique_feedbacks):
-                T_p = T_curr[inverse_indices == i]
-                G_p = self.get_next_guesses_hardmode(T_p, G_curr, p, g_star, F, C)
-                queue.append((T_p, G_p, self.v_curr, p.item(), depth + 1))
+            for p, T_p in zip(codes, parts):
+                G_p = self.get_next_guesses_hardmode(T_p, G_curr, p, g_star, C)
+                queue.append((T_p, G_p, v_curr, p, depth + 1))
+                child_sum, child_max = self._depth_lower_bound(len(T_p), depth + 1)
+                lb_sum += child_sum
+                lb_max = max(lb_max, child_max)
+
+            # Prune: this candidate cannot beat the incumbent
+            if lb_sum / n + 0.001 * lb_max > bound:
+                return None
+
+        # Estimated depths depend on the node's depth, so with a horizon only
+        # the greedy guesses are memoized
+        if self.memo is not None and not self.horizon:
+            self._memoize_subtrees(D, owners, parents, depths, keys)
 
         return np.array(D)
 
 
+    def _memoize_subtrees(self, D, owners, parents, depths, keys):
+        """
+        Stores the relative depths of every memoized vertex of a completed
+        subtree: each entry of D counts for all ancestors of its vertex
+        """
+        D_sub = {v: [] for v, key in enumerate(keys) if key is not None}
+        for d, v in zip(D, owners):
+            while v != -1:
+                if keys[v] is not None:
+                    D_sub[v].append(d)
+                v = parents[v]
+
+        for v, D_v in D_sub.items():
+            entry = self.memo.entries.get(keys[v])
+            if entry is not None and entry[2] is None:
+                D_rel = np.sort(np.array(D_v, dtype=np.int16) - (depths[v] - 1)).astype(np.int8)
+                self.memo.put(keys[v], entry[0], entry[1], D_rel)
+
+
+    def _partition_by_feedback(self, T, g, g_in_T, F, xp):
+        """
+        Splits the targets T by their feedback to guess g in one stable
+        argsort. With ``g_in_T``, g itself gets a key past every code, so
+        it sorts last and is cut off. Returns the feedback codes, in
+        increasing order, and the parts: contiguous views of the single
+        sorted buffer, each in the order of T
+        """
+        keys = F[T, g].astype(xp.int32)
+        if g_in_T:
+            keys[T == g] = self.base
+        order = xp.argsort(keys, kind='stable')
+        buffer, keys = T[order], keys[order]
+
+        n = len(T) - 1 if g_in_T else len(T)
+        if n <= 0:
+            return [], []
+        bounds = (xp.flatnonzero(keys[1:n] != keys[:n - 1]) + 1).tolist()
+        starts, ends = [0] + bounds, bounds + [n]
+        codes = keys[starts].tolist()
+        return codes, [buffer[start:end] for start, end in zip(starts, ends)]
+
+
+    def _depth_lower_bound(self, n, depth):
+        return depth_lower_bound(n, depth, self.base, self.targets_have_self_id)
+
+
     def append2Tree(self, g_star, v_curr, v_parent, p_parent):
         """
-        Append vertex and edge to tree
+        Append vertex and edge to tree (vertices come in id order)
         """
-        self.tree['vertices'].append((v_curr, g_star))
-        if v_curr != 0:
-            self.tree['successors'][(v_parent, p_parent)] = v_curr
+        if self.stream is not None:
+            self.stream.append(int(g_star), v_parent, -1 if p_parent is None else p_parent)
+            return
+        self.tree_guesses.append(int(g_star))
+        self.tree_parents.append(v_parent)
+        self.tree_codes.append(-1 if p_parent is None else p_parent)
 
 
-    def get_next_guesses_hardmode(self, T, G, feedback, g_star, F, C):
+    def get_next_guesses_hardmode(self, T, G, feedback, g_star, C):
         """
-        Vectorized hard-mode filtering using precomputed LUT and feedback matrix
+        Vectorized hard-mode filtering using precomputed LUT and lazily
+        computed guess-vs-guess feedback columns
         Returns subset of allowed guess indices
         """
         if not self.configs['hard_mode'] or len(T) <= 2:
             return None
         
         # Feedbacks that each candidate (col) would produce w.r.t. previous guess (row)
-        possible_feedbacks = F[G, g_star]
+        gpu = not isinstance(G, np.ndarray)
+        possible_feedbacks = self.guess_columns.column(g_star, gpu)[G]
 
         # Mask of which feedbacks are compatible
         valid_mask = C[possible_feedbacks, feedback]
@@ -181,6 +790,52 @@ class Guess_Tree:
         return G[valid_mask]
 
 
+    def print_checkpoint_summary(self):
+        """
+        Reports the checkpoints written by the serial build, if any
+        """
+        if self.checkpoint_writes and self.flags['print_diagnosis']:
+            print(f"\n  [Checkpoint] {self.checkpoint_writes} written | last: "
+                  f"{self.checkpoint_bytes / (1 << 20):.1f} MB | total write time: {self.checkpoint_write_time:.2f}s")
+
+
+    def print_build_summary(self):
+        """
+        Reports the peak number of pending nodes of the serial build and the
+        peak resident memory of the process
+        """
+        if not self.flags['print_diagnosis']:
+            return
+        order = "DFS" if self.dfs else "BFS"
+        rss = ""
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+            scale = 1 if sys.platform == 'darwin' else 1024
+            rss = f" | peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1 << 20):.1f} MB"
+        print(f"\n  [Build] {order} order: peak {self.peak_pending} pending nodes{rss}")
+
+
+    def print_memo_summary(self):
+        """
+        Reports the transposition table of the look-ahead solver, if any.
+        Worker processes (--workers, --parallel_build) keep their own
+        tables; their hits and misses are reported summed on a second line
+        """
+        solver = self.optimizer.solvers_cpu[0]
+        memo = getattr(solver, 'memo', None)
+        if memo is None or not self.flags['print_diagnosis']:
+            return
+        hits, misses = self.worker_memo_counts
+        pool = getattr(solver, 'pool', None)
+        if pool is not None:
+            hits, misses = hits + pool.memo_counts[0], misses + pool.memo_counts[1]
+        if hits + misses == 0:
+            print(f"\n  [Memo] {memo.summary()}")
+            return
+        print(f"\n  [Memo] main process: {memo.summary()}")
+        print(f"  [Memo] workers: {memo.counts_summary(hits, misses)}")
+
+
     def start_diagnosis(self):
         if not self.flags['print_diagnosis']: return
         start_time = time.time()
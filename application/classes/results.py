@@ -1,17 +1,18 @@
+from classes.compact_tree import CompactTree, LEAF_SENTINEL
+from utils.feedback_utils import GuessFeedbackColumns
+from utils.xp_utils import cp
 import json
 import numpy as np
 
 
-# Must match Guess_Tree.LEAF_SENTINEL.
-LEAF_SENTINEL = -1
-
-
 class Results:
     def __init__(self, instance, flags, configs):
-        G, T, F, _, decode_feedback, _, _ = instance
+        G, T, F, C, decode_feedback, _, _ = instance
         self.words_map = G
         self.T = np.arange(len(T))
-        self.F = F
+        # Evaluation gathers on the host
+        self.F = F if isinstance(F, np.ndarray) else cp.asnumpy(F)
+        self.C = C if C is None or isinstance(C, np.ndarray) else cp.asnumpy(C)
         self.decode_feedback = decode_feedback
         self.flags = flags
         self.configs = configs
@@ -22,26 +23,36 @@ class Results:
         self.targets_have_self_id = bool(configs.get('targets_have_self_id', True))
 
         # Result Containers
-        self.tree = {'root': 0, 'vertices': [], 'successors': {}}
+        self.tree = None  # CompactTree
         self.decoded_tree = {}
         self.stats = {
             'exp_guesses': 0, 'std_guesses': 0, 'max_guesses': 0,
             'distribution': None, 'build_runtime': 0, '#vertices': 0
         }
+        # Guess-vs-guess feedback for the hard-mode check
+        self.guess_columns = GuessFeedbackColumns(G) if configs['hard_mode'] else None
 
 
     def set_data(self, tree, runtime):
         """
-        Ingests the raw data from the solver
+        Ingests the raw data from the solver (a CompactTree, or a tree in
+        its dict form)
         """
+        if isinstance(tree, dict):
+            tree = CompactTree.from_dict(tree)
         self.tree = tree
         self.stats['build_runtime'] = runtime
-        self.stats['#vertices'] = len(tree['vertices'])
+        self.stats['#vertices'] = len(tree)
+        # Vertices upgraded to their look-ahead guess (anytime builds)
+        self.stats['upgraded'] = tree.upgraded
 
 
     def evaluate(self):
         """
         Evaluates the tree by simulating all possible games (Full Simulation).
+        The games advance together, one guess per step: every target still
+        playing gathers the guess of its vertex, its feedback and its child
+        in one array operation (``CompactTree.child_many``).
 
         For games with self-id actions (Wordle, Mastermind): ``depth`` counts
         guesses and a leaf is reached when the vertex's action equals the
@@ -51,73 +62,86 @@ class Results:
         at pure leaves, and the cost is the number of attribute queries on
         the root-to-leaf path (``depth - 1`` in the current indexing where
         ``depth`` starts at 1 at the root).
-        """
-        D = []
-
-        for target in self.T:
-            v_curr = 0
-            depth = 1
-
-            while True:
-                v_curr, guess = self.tree['vertices'][v_curr]
-                # Normalize (guess may be a 0-d numpy / cupy array).
-                if hasattr(guess, 'item'):
-                    guess_val = guess.item()
-                else:
-                    guess_val = int(guess)
 
-                if self.targets_have_self_id:
-                    if guess_val == int(target):
-                        D.append(depth)
-                        break
-                else:
-                    # Zoo: LEAF_SENTINEL marks a pure leaf (identification by
-                    # arrival). Record cost as the number of queries = depth - 1.
-                    if guess_val == LEAF_SENTINEL:
-                        D.append(max(0, depth - 1))
-                        break
-
-                f = self.F[target, guess_val].item()
-                v_curr = self.tree['successors'][(v_curr, f)]
-                depth += 1
+        In hard mode, every guess is also checked against the feedback of
+        the guesses above it (see ``_check_hard_mode``).
+        """
+        D = np.zeros(len(self.T), dtype=np.int64)
+        v_curr = np.zeros(len(self.T), dtype=np.int64)
+        playing = self.T
+        depth = 1
+
+        while len(playing):
+            guess_val = self.tree.guesses[v_curr[playing]]
+            if self.targets_have_self_id:
+                done = guess_val == playing
+                D[playing[done]] = depth
+            else:
+                # Zoo: LEAF_SENTINEL marks a pure leaf (identification by
+                # arrival). Record cost as the number of queries = depth - 1.
+                done = guess_val == LEAF_SENTINEL
+                D[playing[done]] = max(0, depth - 1)
+            playing, guess_val = playing[~done], guess_val[~done]
+
+            f = self.F[playing, guess_val]
+            child = self.tree.child_many(v_curr[playing], f)
+            if (child < 0).any():
+                target = int(playing[np.argmax(child < 0)])
+                raise ValueError(f"The tree has no vertex for target {target} after {depth} guesses.")
+            v_curr[playing] = child
+            depth += 1
+
+        self._calculate_stats(D)
+        if self.configs['hard_mode']:
+            self.stats['hard_mode_violations'] = self._check_hard_mode()
+
+
+    def _check_hard_mode(self):
+        """
+        Returns the vertices whose guess is inconsistent with the feedback
+        received by a guess above them, i.e. C[F_GG[g, g_prev], f_prev] is
+        False for an ancestor (g_prev, f_prev). Checked one ancestor level
+        at a time for all vertices together
+        """
+        tree = self.tree
+        violations = np.zeros(len(tree), dtype=bool)
+        # (vertex, the vertex on its path just below the ancestor checked)
+        w = np.flatnonzero((tree.parents >= 0) & (tree.guesses != LEAF_SENTINEL))
+        below = w
+        while len(w):
+            above = tree.parents[below]
+            feedback = self.guess_columns.pairs(tree.guesses[w], tree.guesses[above])
+            violations[w[~self.C[feedback, tree.codes[below]]]] = True
 
-        self._calculate_stats(np.array(D))
+            deeper = tree.parents[above] >= 0
+            w, below = w[deeper], above[deeper]
+        return np.flatnonzero(violations).tolist()
 
 
     def evaluate_decoded(self):
         """
-        Evaluates the decoded tree by simulating all possible games
+        Evaluates the decoded tree by simulating all possible games. The
+        decoded tree is indexed into a CompactTree once (see ``load_tree``),
+        so repeated evaluations run on the arrays
         """
-        if not self.configs.get('targets_have_self_id', True):
-            raise NotImplementedError("evaluate_decoded is not supported for games without self-id actions (e.g. Zoo)")
-        word_to_idx = {w: i for i, w in enumerate(self.words_map)}
-        D = []
-
-        for target in self.T:
-            v_curr = 0
-            depth = 1
+        if self.tree is None:
+            self._index_decoded()
+        self.evaluate()
 
-            while True:
-                v_curr, guess_str = self.decoded_tree['vertices'][v_curr]
-                guess_idx = word_to_idx[guess_str]
-                if guess_idx == target:
-                    D.append(depth)
-                    break
-                f_code = self.F[target, guess_idx].item()
-                f_array = self.decode_feedback(f_code)
-                f_tuple = tuple(f_array.tolist())
-                key = str((v_curr, f_tuple))
-                v_curr = self.decoded_tree['successors'][key]
-                if hasattr(v_curr, 'item'):
-                    v_curr = v_curr.item()
-                depth += 1
 
-        self._calculate_stats(np.array(D))
-        self.stats['#vertices'] = len(self.decoded_tree['vertices'])
+    def _index_decoded(self):
+        """
+        Parses the decoded tree into integer arrays: a guess index per vertex
+        and children keyed by feedback code
+        """
+        self.tree = CompactTree.from_decoded(self.decoded_tree, self.words_map, self.decode_feedback,
+                                             self.configs.get('base', 243))
+        self.stats['#vertices'] = len(self.tree)
 
 
     def _calculate_stats(self, D):
-        distribution = {int(d): int((D == d).sum()) for d in np.unique(D)}
+        counts = np.bincount(D)
+        distribution = {int(d): int(counts[d]) for d in np.flatnonzero(counts)}
         self.stats['exp_guesses'] = D.mean()
         self.stats['std_guesses'] = D.std()
         self.stats['max_guesses'] = D.max()
@@ -128,50 +152,21 @@ class Results:
         """
         Decode tree: Converts internal IDs and codes to readable strings and tuples
         """
-        if self.decoded_tree or not self.tree['vertices']:
+        if self.decoded_tree or self.tree is None or not len(self.tree):
             return
-        
-        self.decoded_tree = {'root': 0, 'vertices': [], 'successors': {}}
-
-        # Decode vertices
-        for v_curr, guess_idx in self.tree['vertices']:
-            gi = guess_idx.item() if hasattr(guess_idx, 'item') else int(guess_idx)
-            if gi == LEAF_SENTINEL:
-                # Pure leaf (Zoo): no terminal action.
-                self.decoded_tree['vertices'].append((v_curr, None))
-            else:
-                self.decoded_tree['vertices'].append(
-                    (v_curr, self.words_map[gi])
-                )
-
-        # Decode Successors
-        for (v_parent, feedback_code), child_id in self.tree['successors'].items():
-            if feedback_code is None:
-                continue
 
-            if hasattr(feedback_code, 'item'):
-                feedback_code = feedback_code.item()
-            
-            # Decode feedback
-            feedback_array = self.decode_feedback(feedback_code)
-            feedback_tuple = tuple(feedback_array.tolist())
-            key = str((v_parent, feedback_tuple))
-            
-            if hasattr(child_id, 'item'):
-                child_id = child_id.item()
-
-            self.decoded_tree['successors'][key] = child_id
+        # Pure leaves (Zoo) decode to None: no terminal action
+        self.decoded_tree = self.tree.to_decoded(self.words_map, self.decode_feedback)
 
 
     def load_tree(self, filepath):
         """
-        Loads the decision tree from a JSON file
+        Loads the decision tree from a JSON file and indexes it for
+        evaluation
         """
         with open(filepath, 'r') as f:
-            tree = json.load(f)
-            self.decoded_tree = tree
-            # If we load a tree, we often want to evaluate it immediately
-            self.stats['#vertices'] = len(self.decoded_tree['vertices'])
+            self.decoded_tree = json.load(f)
+        self._index_decoded()
 
 
     def print(self):
@@ -183,9 +178,8 @@ class Results:
         
         # Determine first guess for display
         first_guess = "N/A"
-        if self.tree['vertices']:
-            root_action = self.tree['vertices'][0][1]
-            ra = root_action.item() if hasattr(root_action, 'item') else int(root_action)
+        if self.tree is not None and len(self.tree):
+            ra = int(self.tree.guesses[0])
             if ra == LEAF_SENTINEL:
                 first_guess = "(leaf)"
             else:
@@ -203,6 +197,12 @@ class Results:
             f"#Vertices: {self.stats['#vertices']}\n"
             f"Best first guess: {first_guess}\n"
         )
+        if self.stats.get('upgraded') is not None:
+            print(f"Upgraded vertices: {len(self.stats['upgraded'])}\n")
+        if self.stats.get('hard_mode_violations') is not None:
+            violations = self.stats['hard_mode_violations']
+            shown = f" (first vertices: {violations[:10]})" if violations else ""
+            print(f"Hard-mode violations: {len(violations)}{shown}\n")
 
 
     def save(self):
@@ -212,7 +212,6 @@ class Results:
         if not self.flags['save_tree']:
             return
         
-        self.decode_tree()
         filepath = (
             "data/decision_tree_hard.json"
             if self.configs['hard_mode']
@@ -220,6 +219,10 @@ class Results:
         )
 
         with open(filepath, "w") as f:
-            json.dump(self.decoded_tree, f)
+            if self.decoded_tree or self.tree is None:
+                json.dump(self.decoded_tree, f)
+            else:
+                # Written straight from the compact tree: no decoded copy
+                self.tree.write_decoded(f, self.words_map, self.decode_feedback)
 
         print(f"Tree saved in \"{filepath}\"\n")
\ No newline at end of file
@@ -0,0 +1,124 @@
+from utils.xp_utils import cp
+from utils.checkpoint_utils import pack_ragged, unpack_ragged
+from collections import OrderedDict
+import numpy as np
+import hashlib
+
+
+class TranspositionTable:
+    """
+    In-memory memo of greedy subtree results, keyed by a fingerprint of the
+    sorted target set (and of the allowed guesses in hard mode). An entry
+    holds the greedy guess of the node and, once its subtree has been built
+    to completion, the depths D of its targets relative to the node
+    (node = depth 1). Entries are evicted least-recently-used beyond
+    ``max_bytes``
+    """
+    # Rough per-entry cost (dict slot, key, list, ints) on top of D
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+    def key(self, T, G=None):
+        """
+        Returns the fingerprint of (sorted T, G)
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self._as_bytes(T, sort=True))
+        if G is not None:
+            h.update(b"\0")
+            h.update(self._as_bytes(G))
+        return h.digest()
+
+
+    def get(self, key):
+        """
+        Returns the entry [guess, guess_in_T, D_rel] for ``key`` (D_rel is
+        None until the subtree is known), or None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+
+    def put(self, key, guess, guess_in_T, D_rel=None):
+        """
+        Stores the greedy guess of a node and, if given, its relative depths
+        """
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.n_bytes -= self._size(old)
+
+        entry = [int(guess), bool(guess_in_T), D_rel]
+        self.entries[key] = entry
+        self.n_bytes += self._size(entry)
+
+        while self.n_bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.n_bytes -= self._size(evicted)
+
+
+    def export(self):
+        """
+        Returns the entries, in LRU order, as flat arrays (see
+        checkpoint_utils): keys, guesses, in-T flags and the ragged D_rel,
+        with has_D marking the entries whose subtree is known
+        """
+        entries = list(self.entries.items())
+        has_D = np.array([entry[2] is not None for _, entry in entries], dtype=bool)
+        D_values, D_offsets = pack_ragged([entry[2] for _, entry in entries if entry[2] is not None], dtype=np.int8)
+        return {
+            'memo_keys': np.frombuffer(b"".join(key for key, _ in entries), dtype=np.uint8).reshape(-1, 16),
+            'memo_guesses': np.array([entry[0] for _, entry in entries], dtype=np.int64),
+            'memo_in_T': np.array([entry[1] for _, entry in entries], dtype=bool),
+            'memo_has_D': has_D,
+            'memo_D_values': D_values,
+            'memo_D_offsets': D_offsets,
+        }
+
+
+    def restore(self, arrays):
+        """
+        Re-inserts the entries of ``export``
+        """
+        D_rels = iter(unpack_ragged(arrays['memo_D_values'], arrays['memo_D_offsets']))
+        for key, guess, in_T, has_D in zip(arrays['memo_keys'], arrays['memo_guesses'],
+                                           arrays['memo_in_T'], arrays['memo_has_D']):
+            self.put(key.tobytes(), guess, in_T, next(D_rels) if has_D else None)
+
+
+    def summary(self):
+        return (f"{self.counts_summary(self.hits, self.misses)} | "
+                f"entries: {len(self.entries)} | size: {self.n_bytes / (1 << 20):.1f} MB")
+
+
+    @staticmethod
+    def counts_summary(hits, misses):
+        lookups = hits + misses
+        rate = hits / lookups if lookups else 0.0
+        return f"hits: {hits} | misses: {misses} | hit rate: {rate:.1%}"
+
+
+    def _size(self, entry):
+        D_rel = entry[2]
+        return self.ENTRY_OVERHEAD + (D_rel.nbytes if D_rel is not None else 0)
+
+
+    @staticmethod
+    def _as_bytes(arr, sort=False):
+        if not isinstance(arr, np.ndarray):
+            arr = cp.asnumpy(arr)
+        arr = np.asarray(arr, dtype=np.int64)
+        if sort:
+            arr = np.sort(arr)
+        return arr.tobytes()
@@ -1,5 +1,6 @@
 from classes.results import *
 from utils.instance_utils import *
+from utils.games import LOADERS, list_games
 import argparse
 
 
@@ -8,13 +9,23 @@ def get_args():
 
     # Configs
     parser.add_argument('--game', type=str, default='wordle',
-                        choices=['wordle', 'mastermind', 'zoo'],
+                        choices=list(LOADERS),
                         help='Game instance to evaluate (default: wordle)')
+    parser.add_argument('--targets', type=str, default='data/solutions.txt',
+                        help='Wordle target word list; word length and alphabet follow the lists')
+    parser.add_argument('--guesses', type=str, default='data/non_solutions.txt',
+                        help='Wordle extra (non-target) guess word list')
     parser.add_argument('--cpu', action='store_true', help='Run on CPU only (disable GPU)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for building the feedback matrix (default: 1)')
     parser.add_argument('--hard_mode', action='store_true', help='Evaluate in Hard Mode')
 
     # Flags
     parser.add_argument('--no_diagnosis', action='store_true', help='Disable diagnosis printing')
+    parser.add_argument('--list_games', action='store_true',
+                        help='List the available games and exit (no matrices are built)')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Rebuild the feedback matrix instead of using the on-disk cache')
 
     return parser.parse_args()
 
@@ -22,15 +33,24 @@ def get_args():
 def main():
     args = get_args()
 
+    if args.list_games:
+        for game in list_games():
+            print(game.summary())
+        return
+
     # Get flags and configs from args
     flags = {
         'print_diagnosis': not args.no_diagnosis,
+        'use_cache': not args.no_cache,
         'evaluate': True,
         'save_tree': False
     }
     configs = {
         'GPU': not args.cpu,
+        'workers': args.workers,
         'game': args.game,
+        'targets_file': args.targets,
+        'guesses_file': args.guesses,
         'hard_mode': args.hard_mode,
         'metric': 0,
         'k': 15,
@@ -0,0 +1,50 @@
+"""
+Admissible lower bounds on the depths of a decision (sub)tree.
+
+A node with ``n`` targets at depth ``d`` can identify at most one target
+itself (its own guess) and has at most ``base`` children, so at most
+``base**j`` targets can end ``j`` levels below it. Filling those levels
+greedily from the top gives the smallest possible sum of depths and the
+smallest possible maximum depth of any tree below the node, whatever the
+guesses. The Subtree-k search uses these to prune candidates that cannot
+beat the incumbent (see Guess_Tree.build_subtree).
+"""
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def depth_lower_bound(n, depth, base, targets_have_self_id=True):
+    """
+    Returns (sum, max) lower bounds on the depths D of the ``n`` targets of
+    a node at ``depth``, matching the D convention of Guess_Tree: a target
+    costs the depth of its terminal guess, or, without self-id actions
+    (Zoo), the number of queries above its leaf
+    """
+    levels = depth_lower_bound_levels(n, depth, base, targets_have_self_id)
+    return sum(cost * k for cost, k in levels), levels[-1][0]
+
+
+@functools.lru_cache(maxsize=None)
+def depth_lower_bound_levels(n, depth, base, targets_have_self_id=True):
+    """
+    Returns the greedy level fill behind ``depth_lower_bound`` as a tuple of
+    (depth, number of targets) pairs. Also used as the partition-size
+    estimate of a subtree cut off by the look-ahead horizon
+    """
+    if targets_have_self_id:
+        cost, cap = depth, 1
+    elif n == 1:
+        return ((depth - 1, 1),)
+    else:
+        # A node with several targets always queries; leaves start below it
+        cost, cap = depth, base
+
+    levels, remaining = [], n
+    while True:
+        k = min(cap, remaining)
+        levels.append((cost, k))
+        remaining -= k
+        if remaining == 0:
+            return tuple(levels)
+        cost += 1
+        cap *= base
@@ -0,0 +1,123 @@
+"""
+Persistent on-disk cache for feedback matrices.
+
+Entries are plain ``.npy`` files under ``data/cache`` named
+``<name>_<key>.npy``, where ``key`` is a SHA-256 digest of the word lists,
+the mode and the game parameters. A changed word list therefore produces a
+new key; older entries with the same ``name`` are stale and are removed
+when the new one is written.
+
+Entries are memory-mapped on load, so startup only touches the pages that
+are actually read and repeated runs share them through the OS page cache.
+Writes go to a temporary file that is atomically renamed into place
+(``atomic_write``, shared with the checkpoint and calibration files).
+"""
+from pathlib import Path
+import contextlib
+import hashlib
+import os
+import numpy as np
+
+
+CACHE_DIR = 'data/cache'
+
+# Bump when the encoding of cached matrices changes
+CACHE_VERSION = 1
+
+
+def cache_key(*parts):
+    """
+    Returns a hex digest over the given parts (strings, numbers or lists of
+    strings such as word lists)
+    """
+    h = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            part = "\n".join(str(p) for p in part)
+        h.update(b"\0")
+        h.update(str(part).encode())
+    return h.hexdigest()[:32]
+
+
+def load_or_build(name, key, build_fn, flags=None, cache_dir=CACHE_DIR):
+    """
+    Returns the cached array for (name, key), memory-mapped read-only.
+    On a miss, calls ``build_fn()``, stores its result and invalidates
+    stale entries of the same name.
+    """
+    print_diagnosis = bool(flags and flags.get('print_diagnosis'))
+    cache_dir = Path(cache_dir)
+    path = cache_dir / f"{name}_{key}.npy"
+
+    if path.exists():
+        try:
+            arr = np.load(path, mmap_mode='r')
+            if print_diagnosis:
+                print(f"  [Cache] Loaded {name} from \"{path}\"")
+            return arr
+        except (ValueError, OSError):
+            # Corrupt or truncated entry: rebuild it
+            path.unlink(missing_ok=True)
+
+    arr = build_fn()
+    save(path, arr)
+    _remove_stale(cache_dir, name, path)
+    if print_diagnosis:
+        print(f"  [Cache] Stored {name} in \"{path}\"")
+
+    # Map the stored entry, so callers see its final path (a memmap built in
+    # the cache directory was renamed into place by save)
+    return np.load(path, mmap_mode='r')
+
+
+def cached_matrix(name, key_parts, build_fn, flags=None):
+    """
+    Shared cached builder: returns ``build_fn(out_dir=...)`` through the
+    on-disk cache, keyed by ``cache_key(*key_parts)``, unless
+    ``flags['use_cache']`` is False
+    """
+    if flags is not None and not flags.get('use_cache', True):
+        return build_fn()
+    return load_or_build(name, cache_key(*key_parts), lambda: build_fn(out_dir=CACHE_DIR), flags)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='wb'):
+    """
+    Yields a temporary file next to ``path``, opened with ``mode``, and
+    renames it onto ``path`` when the block completes. Readers see either
+    the previous file or the complete new one
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def save(path, arr):
+    """
+    Atomically writes ``arr`` as a .npy file. A memmap whose backing .npy
+    file already lives in the cache directory (e.g. the output of
+    parallel_utils.build_matrix_parallel) is renamed into place instead
+    of copied
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(arr, np.memmap) and arr.filename and Path(arr.filename).parent.resolve() == path.parent.resolve():
+        os.replace(arr.filename, path)
+        return
+    if hasattr(arr, 'get'):
+        arr = arr.get()  # CuPy -> NumPy
+    with atomic_write(path) as f:
+        np.save(f, np.asarray(arr))
+
+
+def _remove_stale(cache_dir, name, keep):
+    for stale in cache_dir.glob(f"{name}_{'?' * 32}.npy"):
+        if stale != keep:
+            stale.unlink(missing_ok=True)
@@ -0,0 +1,147 @@
+"""
+Per-backend cost models for ``DeviceOptimizer``.
+
+Each routed backend (the configured CPU kernel, multithreaded CPU kernels,
+the GPU) gets a model of the seconds one node costs it:
+
+    seconds ~ c0 + c1 * n_t * n_g + c2 * n_t + c3 * n_g
+
+fitted by least squares on timed (n_t, n_g) samples with the data already
+on the backend's device. With a GPU, moving a node's arrays between host
+and device is fitted separately (``h2d`` and ``d2h``, seconds ~ c0 + c1 * n
+elements) and added to the cost of a backend on the other device.
+
+Models are stored in ``application/results/calibration.json`` under a
+fingerprint of the hardware and library versions, then under a key naming
+the metric, score rule, base and backends, so a run only calibrates on a
+new machine or configuration. The file is rewritten whole with
+``cache_utils.atomic_write``.
+"""
+from utils.cache_utils import atomic_write
+from utils.xp_utils import cp, HAS_CUPY
+from utils.jit_utils import HAS_NUMBA
+import functools
+import hashlib
+import platform
+import json
+import os
+import numpy as np
+
+
+CALIBRATION_FILE = 'application/results/calibration.json'
+
+# Bump when the model form or the stored layout changes
+CALIBRATION_VERSION = 1
+
+# Multithreaded CPU backends routed alongside the configured one, when
+# installed (see utils.guess_selection_utils.CPU_SCORING_BACKENDS)
+ROUTED_CPU_BACKENDS = ('numba', 'threads')
+
+# Sample grid; a backend stops being timed once one sample takes longer
+# than CALIBRATION_POINT_SECONDS
+CALIBRATION_N_T = (8, 64, 512, 4096)
+CALIBRATION_N_G = (64, 1024, 16384)
+CALIBRATION_POINT_SECONDS = 0.5
+
+# Array sizes timed for the transfer models
+TRANSFER_SIZES = (100, 1000, 10000, 100000)
+
+
+@functools.lru_cache(maxsize=None)
+def hardware_fingerprint():
+    """
+    Returns (digest, info): a short digest of the CPU, GPU and library
+    versions, and the readable description it was computed from
+    """
+    info = {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'gpu': None,
+    }
+    if HAS_CUPY:
+        try:
+            props = cp.cuda.runtime.getDeviceProperties(0)
+            name = props['name']
+            info['gpu'] = name.decode() if isinstance(name, bytes) else name
+            info['cupy'] = cp.__version__
+        except Exception:
+            pass
+    if HAS_NUMBA:
+        import numba
+        info['numba'] = numba.__version__
+    digest = hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()[:16]
+    return digest, info
+
+
+def _features(n_t, n_g):
+    return [1.0, n_t * n_g, n_t, n_g]
+
+
+def fit_cost_model(samples):
+    """
+    Fits the coefficients of the node cost model to (n_t, n_g, seconds)
+    samples. Residuals are weighted by 1 / seconds, so small and large
+    nodes count alike; negative coefficients are clipped to zero
+    """
+    X = np.array([_features(n_t, n_g) for n_t, n_g, _ in samples], dtype=np.float64)
+    y = np.array([seconds for *_, seconds in samples], dtype=np.float64)
+    w = 1 / np.maximum(y, 1e-6)
+    coef = np.linalg.lstsq(X * w[:, None], y * w, rcond=None)[0]
+    return np.maximum(coef, 0).tolist()
+
+
+def predict_cost(coef, n_t, n_g):
+    return float(np.dot(coef, _features(n_t, n_g)))
+
+
+def fit_transfer_model(samples):
+    """
+    Fits seconds ~ c0 + c1 * n to (n, seconds) samples
+    """
+    X = np.array([[1.0, n] for n, _ in samples], dtype=np.float64)
+    y = np.array([seconds for _, seconds in samples], dtype=np.float64)
+    return np.maximum(np.linalg.lstsq(X, y, rcond=None)[0], 0).tolist()
+
+
+def predict_transfer(coef, n):
+    return coef[0] + coef[1] * n
+
+
+def load_calibration(key, path=CALIBRATION_FILE):
+    """
+    Returns the models stored under ``key`` for this hardware, or None
+    """
+    digest, _ = hardware_fingerprint()
+    entry = _read(path).get(digest)
+    if not isinstance(entry, dict) or entry.get('version') != CALIBRATION_VERSION:
+        return None
+    return entry['models'].get(key)
+
+
+def save_calibration(key, models, path=CALIBRATION_FILE):
+    """
+    Stores ``models`` under ``key`` for this hardware, keeping every other
+    entry of the file
+    """
+    digest, info = hardware_fingerprint()
+    data = _read(path)
+    entry = data.get(digest)
+    if not isinstance(entry, dict) or entry.get('version') != CALIBRATION_VERSION:
+        entry = data[digest] = {'version': CALIBRATION_VERSION, 'hardware': info, 'models': {}}
+    entry['models'][key] = models
+
+    with atomic_write(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+    return data if isinstance(data, dict) else {}
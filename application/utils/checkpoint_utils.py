@@ -0,0 +1,74 @@
+"""
+On-disk checkpoints of a running tree build.
+
+A checkpoint is one uncompressed ``.npz`` file under ``data/checkpoints``
+named ``build_<key>.npz``, where ``key`` is a digest of everything that
+determines the build (game, word-list contents, mode, metric and its
+parameters, build order), so ``--resume`` never picks up a build of another
+configuration, nor one of a word list that was edited in place. Variable-length
+data (the target sets of the queue, memo depths) is stored as one flat array
+plus offsets. A build killed mid-write leaves the previous checkpoint intact
+(see ``cache_utils.atomic_write``).
+"""
+from utils.cache_utils import cache_key, atomic_write
+from utils.xp_utils import cp
+from pathlib import Path
+import numpy as np
+
+
+CHECKPOINT_DIR = 'data/checkpoints'
+
+# Bump when the arrays stored in a checkpoint change
+CHECKPOINT_FORMAT = 2
+
+
+def checkpoint_path(configs, T, G, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Returns the checkpoint file of the build described by ``configs`` over
+    the target and guess lists T and G
+    """
+    key = cache_key(f"checkpoint v{CHECKPOINT_FORMAT}", configs['game'], list(T), list(G), configs['hard_mode'],
+                    configs['metric'], configs.get('k'), configs.get('score'), configs.get('horizon', 0),
+                    configs.get('build_order', 'bfs'))
+    return Path(checkpoint_dir) / f"build_{key}.npz"
+
+
+def save_checkpoint(path, arrays):
+    """
+    Atomically writes the dict of arrays ``arrays`` to ``path``. Returns the
+    size of the file in bytes
+    """
+    with atomic_write(path) as f:
+        np.savez(f, **arrays)
+    return Path(path).stat().st_size
+
+
+def load_checkpoint(path):
+    """
+    Returns the dict of arrays stored at ``path``, or None if there is no
+    readable checkpoint
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    except (ValueError, OSError):
+        return None
+
+
+def pack_ragged(arrays, dtype=np.int64):
+    """
+    Returns (values, offsets) holding a list of 1-D (NumPy or CuPy) arrays,
+    the i-th being values[offsets[i]:offsets[i + 1]]
+    """
+    arrays = [a if isinstance(a, np.ndarray) else cp.asnumpy(a) for a in arrays]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(a) for a in arrays])
+    values = np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype)
+    return values, offsets
+
+
+def unpack_ragged(values, offsets):
+    return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
@@ -0,0 +1,217 @@
+"""
+Vectorized feedback-matrix construction shared by the Wordle pipeline
+(``instance_utils.py``) and the game loaders (``games.py``).
+
+The builder reproduces the two-pass green/yellow rule of the original
+triple loop exactly, including duplicate letters: a non-green position
+``i`` is yellow iff the copies of ``g_i`` left in the target after the
+greens outnumber the non-green copies of ``g_i`` at earlier positions of
+the guess. Codes use the same base-3 encoding, most significant digit
+first.
+
+Work is tiled over guess columns so the (K, B, L) temporaries stay
+bounded regardless of the size of the word lists.
+
+Word length and alphabet come from the word lists themselves (any
+length, any characters). Codes take the smallest unsigned dtype that
+holds all 3**L of them: uint8 up to L=5, uint16 up to L=10.
+
+Hard mode also needs guess-vs-guess feedback (every guess acting as the
+target), but only one column at a time; ``GuessFeedbackColumns`` computes
+those columns on demand instead of materializing the G x G matrix.
+"""
+from utils.xp_utils import cp
+from utils.parallel_utils import build_matrix_parallel
+import functools
+import numpy as np
+
+
+# Budget (bytes) for the per-block temporaries of the vectorized builder
+FEEDBACK_BLOCK_BYTES = 1 << 25
+
+
+def get_word_length(*word_lists):
+    """
+    Returns the common length of all words, raising if lengths differ
+    """
+    lengths = {len(w) for words in word_lists for w in words}
+    if len(lengths) != 1:
+        raise ValueError(f"Word lists must contain words of a single length, got lengths {sorted(lengths)}.")
+    return lengths.pop()
+
+
+def get_alphabet(*word_lists):
+    """
+    Returns the sorted string of distinct characters used by the word lists
+    """
+    return "".join(sorted({c for words in word_lists for w in words for c in w}))
+
+
+def feedback_dtype(L):
+    """
+    Returns the smallest unsigned dtype that holds the 3**L feedback codes
+    """
+    n_codes = 3 ** L
+    if n_codes <= 1 << 8:
+        return np.uint8
+    if n_codes <= 1 << 16:
+        return np.uint16
+    raise ValueError(f"Word length {L} gives {n_codes} feedback codes; at most 65,536 are supported.")
+
+
+def encode_words(words, alphabet=None):
+    """
+    Encode words as an (n, L) array of letter indices into ``alphabet``
+    (by default the alphabet of ``words`` itself)
+    """
+    if alphabet is None:
+        alphabet = get_alphabet(words)
+    index = {c: i for i, c in enumerate(alphabet)}
+    return np.array([[index[c] for c in w] for w in words], dtype=np.int16).reshape(len(words), -1)
+
+
+def letter_counts(words_int, n_letters):
+    """
+    Per-word letter counts, shape (n, n_letters)
+    """
+    n, L = words_int.shape
+    flat_idx = words_int.astype(np.intp).ravel() + np.repeat(np.arange(n), L) * n_letters
+    counts = np.bincount(flat_idx, minlength=n * n_letters)
+    return counts.reshape(n, n_letters).astype(np.int8)
+
+
+def feedback_block(T_int, T_counts, G_int):
+    """
+    Returns the encoded feedback block F[t, g] for all targets in T_int and
+    the guesses in G_int (one tile of guess columns)
+    """
+    K, L = T_int.shape
+    B = G_int.shape[0]
+    powers = [3 ** (L - 1 - i) for i in range(L)]
+    dtype = feedback_dtype(L)
+
+    # Greens: (K, B, L)
+    green = T_int[:, None, :] == G_int[None, :, :]
+
+    # same[b, i, j]: guess b has the same letter at positions i and j
+    same = G_int[:, :, None] == G_int[:, None, :]
+
+    F = np.zeros((K, B), dtype=dtype)
+    for i in range(L):
+        g_i = G_int[:, i].astype(np.intp)
+
+        # Copies of g_i in the target, minus the greens on that letter at
+        # later positions and every earlier copy of g_i in the guess (earlier
+        # copies are either green or were offered a yellow first)
+        avail = T_counts[:, g_i].astype(np.int8)
+        avail -= same[:, i, :i].sum(axis=1, dtype=np.int8)[None, :]
+        for j in range(i + 1, L):
+            avail -= (green[:, :, j] & same[None, :, i, j])
+
+        yellow = ~green[:, :, i] & (avail > 0)
+        F += green[:, :, i] * dtype(2 * powers[i])
+        F += yellow * dtype(powers[i])
+
+    return F
+
+
+def feedback_pairs(T_int, T_counts, G_int):
+    """
+    Returns the encoded feedback of each pair (T_int[p], G_int[p]): the
+    diagonal of ``feedback_block``, without the block
+    """
+    P, L = T_int.shape
+    powers = [3 ** (L - 1 - i) for i in range(L)]
+    dtype = feedback_dtype(L)
+    rows = np.arange(P)
+
+    green = T_int == G_int
+    same = G_int[:, :, None] == G_int[:, None, :]
+
+    F = np.zeros(P, dtype=dtype)
+    for i in range(L):
+        # Same rule as feedback_block, one pair per row
+        avail = T_counts[rows, G_int[:, i].astype(np.intp)].astype(np.int8)
+        avail -= same[:, i, :i].sum(axis=1, dtype=np.int8)
+        for j in range(i + 1, L):
+            avail -= (green[:, j] & same[:, i, j])
+
+        yellow = ~green[:, i] & (avail > 0)
+        F += green[:, i] * dtype(2 * powers[i])
+        F += yellow * dtype(powers[i])
+
+    return F
+
+
+def feedback_rows(T_int, T_counts, G_int, start, end, block_cols=None):
+    """
+    Returns rows start:end of the feedback matrix, tiled over guess columns
+    """
+    T_int, T_counts = T_int[start:end], T_counts[start:end]
+    K, L = T_int.shape
+    nG = G_int.shape[0]
+
+    if block_cols is None:
+        # green + same + a few (K, B) int8 temporaries per column
+        block_cols = max(1, FEEDBACK_BLOCK_BYTES // max(1, K * (L + 8)))
+
+    F = np.empty((K, nG), dtype=feedback_dtype(L))
+    for col in range(0, nG, block_cols):
+        col_end = min(col + block_cols, nG)
+        F[:, col:col_end] = feedback_block(T_int, T_counts, G_int[col:col_end])
+
+    return F
+
+
+def get_feedback_matrix_vectorized(T, G, block_cols=None, workers=1, out_dir=None):
+    """
+    Returns the encoded feedback matrix, where F[t, g] represents the
+    feedback pattern of target t and guess g (vectorized CPU, tiled over
+    guess columns). With ``workers > 1`` row blocks are built in a process
+    pool that writes into one shared memmap (see utils.parallel_utils)
+    """
+    L = get_word_length(T, G)
+    alphabet = get_alphabet(T, G)
+    T_int = encode_words(T, alphabet)
+    G_int = encode_words(G, alphabet)
+    T_counts = letter_counts(T_int, len(alphabet))
+    K, nG = len(T_int), len(G_int)
+
+    if workers > 1:
+        block_fn = functools.partial(feedback_rows, T_int, T_counts, G_int, block_cols=block_cols)
+        return build_matrix_parallel(block_fn, (K, nG), feedback_dtype(L), workers, out_dir=out_dir)
+
+    return feedback_rows(T_int, T_counts, G_int, 0, K, block_cols=block_cols)
+
+
+class GuessFeedbackColumns:
+    """
+    Lazily computed columns F_GG[:, g] of the guess-vs-guess feedback matrix
+    (every guess as the target, g as the guess), kept in an LRU cache
+    """
+    MAX_COLUMNS = 2048
+
+    def __init__(self, G, max_columns=MAX_COLUMNS):
+        alphabet = get_alphabet(G)
+        self.G_int = encode_words(G, alphabet)
+        self.G_counts = letter_counts(self.G_int, len(alphabet))
+        self._cached_column = functools.lru_cache(maxsize=max_columns)(self._compute_column)
+
+
+    def column(self, g, gpu=False):
+        """
+        Returns F_GG[:, g] as a NumPy (or CuPy, if ``gpu``) array
+        """
+        return self._cached_column(int(g), bool(gpu))
+
+
+    def pairs(self, targets, guesses):
+        """
+        Returns F_GG[targets, guesses] elementwise, as a NumPy array
+        """
+        return feedback_pairs(self.G_int[targets], self.G_counts[targets], self.G_int[guesses])
+
+
+    def _compute_column(self, g, gpu):
+        col = feedback_block(self.G_int, self.G_counts, self.G_int[g:g + 1])[:, 0]
+        return cp.asarray(col) if gpu else col
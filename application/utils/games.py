@@ -1,7 +1,11 @@
 """
 Game abstraction layer for the generalized guessing-game solver.
 
-Each game exposes a loader that returns a dict with keys:
+Each game exposes a loader that returns a lazy ``GameInstance``. Names and
+metadata are available as soon as it is loaded; ``F`` is only computed on
+first access, through the shared on-disk cache (see utils.cache_utils), so
+dispatching on ``--game`` or listing games never builds a matrix. The
+instance keeps dict-style access with keys:
 
     G_names         : list[str]          display names for guesses,  len = n_G
     T_names         : list[str]          display names for targets,  len = n_T
@@ -22,50 +26,89 @@ For the three instances used in the paper:
              feedback = attribute value on target
 """
 from pathlib import Path
+import functools
 import itertools
 import csv
 import numpy as np
+from utils.feedback_utils import get_feedback_matrix_vectorized, get_word_length, feedback_dtype
+from utils.parallel_utils import build_matrix_parallel
+from utils.cache_utils import cached_matrix
+
+
+class GameInstance:
+    """
+    Lazily loaded game. ``meta`` holds every key of the module docstring
+    except ``F``; ``F`` is built on first access by ``build_F`` through the
+    shared cached builder (``cache_parts`` is the cache key, or None for
+    games whose matrix is cheaper to rebuild than to load). Cache entries are
+    named ``<cache_name>_F`` (default: the game name); instances over
+    different word lists need different names, since writing an entry
+    removes the other entries of its name
+    """
+    def __init__(self, name, meta, build_F, cache_parts=None, flags=None, cache_name=None):
+        self.name = name
+        self.cache_name = cache_name or name
+        self.meta = meta
+        self._build_F = build_F
+        self._cache_parts = cache_parts
+        self.flags = flags or {}
+        self._F = None
+
+
+    @property
+    def F(self):
+        return self.get_F()
+
+
+    def get_F(self, build_fn=None):
+        """
+        Returns F, building it on first access. ``build_fn(out_dir=None)``
+        overrides how a cache miss is built (e.g. on GPU)
+        """
+        if self._F is None:
+            build_fn = build_fn or self._build_F
+            if self._cache_parts is None:
+                self._F = build_fn()
+            else:
+                self._F = cached_matrix(f"{self.cache_name}_F", self._cache_parts, build_fn, self.flags)
+        return self._F
+
+
+    def summary(self):
+        """
+        One-line description that does not touch F
+        """
+        hard = "yes" if self.meta['hard_mode_supported'] else "no"
+        return (f"{self.name:<11} n_T={len(self.meta['T_names']):<6} n_G={len(self.meta['G_names']):<6} "
+                f"base={self.meta['base']:<5} hard_mode={hard}")
+
+
+    def __getitem__(self, key):
+        return self.F if key == 'F' else self.meta[key]
+
+
+    def get(self, key, default=None):
+        return self.F if key == 'F' else self.meta.get(key, default)
 
 
 # ---------------------------------------------------------------------------
 # Wordle
 # ---------------------------------------------------------------------------
 
-def _wordle_feedback_matrix_cpu(T, G):
-    """Wordle feedback matrix (CPU). Encodes the 5-position ternary code
-    (green=2, yellow=1, gray=0) as a single base-3 integer in [0, 243)."""
-    K, nG, L = len(T), len(G), 5
-    T_int = [[ord(c) - 97 for c in w] for w in T]
-    G_int = [[ord(c) - 97 for c in w] for w in G]
-    F = np.zeros((K, nG), dtype=np.uint8)
-    powers = [3 ** (L - 1 - i) for i in range(L)]
-    c_t = np.zeros((K, 26), dtype=np.int16)
-    for t_idx, t_word in enumerate(T_int):
-        for ch in t_word:
-            c_t[t_idx][ch] += 1
-    for t_idx in range(K):
-        target = T_int[t_idx]
-        for g_idx in range(nG):
-            guess = G_int[g_idx]
-            f_row = [0] * L
-            c_prime = c_t[t_idx].copy()
-            for i in range(L):
-                if guess[i] == target[i]:
-                    f_row[i] = 2
-                    c_prime[guess[i]] -= 1
-            for i in range(L):
-                if f_row[i] == 0 and c_prime[guess[i]] > 0:
-                    f_row[i] = 1
-                    c_prime[guess[i]] -= 1
-            code = 0
-            for i in range(L):
-                code += f_row[i] * powers[i]
-            F[t_idx, g_idx] = code
-    return F
+def _wordle_feedback_matrix_cpu(T, G, workers=1, out_dir=None):
+    """Wordle feedback matrix (CPU). Encodes the L-position ternary code
+    (green=2, yellow=1, gray=0) as a single base-3 integer in [0, 3**L)
+    (243 codes for 5-letter words)."""
+    return get_feedback_matrix_vectorized(T, G, workers=workers, out_dir=out_dir)
 
 
-def _wordle_decode_feedback(code):
-    base, L = 3, 5
+def _read_words(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _wordle_decode_feedback(code, L=5):
+    base = 3
     out = []
     c = int(code)
     for i in range(L):
@@ -73,56 +116,88 @@ def _wordle_decode_feedback(code):
     return tuple(out)
 
 
-def load_wordle(dataset_dir='data'):
-    """Load Wordle. We return the word-level instance and let the caller build F
-    via the original instance_utils.py path (which supports GPU/hard-mode variants).
-    The F returned here is only used by the generic loader; the production
-    Wordle path still goes through ``_get_feedback_matrix`` in instance_utils.py.
+def load_wordle(dataset_dir='data', workers=1, flags=None, targets_file=None, guesses_file=None):
+    """Load Wordle. ``targets_file``/``guesses_file`` default to
+    ``solutions.txt``/``non_solutions.txt`` in ``dataset_dir``. The cache
+    entry for F is shared with the production path in instance_utils.py,
+    which only overrides how a miss is built (GPU builder). It is named
+    after the two lists, so variants do not evict each other's entries.
     """
     dataset_dir = Path(dataset_dir)
-    with open(dataset_dir / 'solutions.txt') as f:
-        T = [line.strip() for line in f if line.strip()]
-    with open(dataset_dir / 'non_solutions.txt') as f:
-        non = [line.strip() for line in f if line.strip()]
-    G = T + non
+    targets_file = Path(targets_file or dataset_dir / 'solutions.txt')
+    guesses_file = Path(guesses_file or dataset_dir / 'non_solutions.txt')
+    T = _read_words(targets_file)
+    G = T + _read_words(guesses_file)
     n_T, n_G = len(T), len(G)
-    F = _wordle_feedback_matrix_cpu(T, G)
+    L = get_word_length(T, G)
     is_target = np.zeros(n_G, dtype=bool)
     is_target[:n_T] = True
-    return {
+    meta = {
         'G_names': G, 'T_names': T,
-        'F': F, 'base': 243,
+        'base': 3 ** L, 'word_length': L,
         'is_target': is_target,
         'targets_have_self_id': True,
-        'decode_feedback': _wordle_decode_feedback,
+        'decode_feedback': functools.partial(_wordle_decode_feedback, L=L),
         'hard_mode_supported': True,
     }
+    build_F = functools.partial(_wordle_feedback_matrix_cpu, T, G, workers)
+    cache_parts = (T, G, f"L={L}", f"dtype={np.dtype(feedback_dtype(L)).name}")
+    cache_name = f"wordle_{targets_file.stem}_{guesses_file.stem}"
+    return GameInstance('wordle', meta, build_F, cache_parts, flags, cache_name)
 
 
 # ---------------------------------------------------------------------------
 # Mastermind (pegs x colors, codes with repetition)
 # ---------------------------------------------------------------------------
 
-def load_mastermind(dataset_dir='data', pegs=4, colors=6):
+# Budget (bytes) for the (rows, n, pegs|colors) temporaries of one block
+_MASTERMIND_BLOCK_BYTES = 1 << 24
+
+
+def _mastermind_feedback_rows(codes_arr, counts, pegs, start, end):
+    """Rows start:end of the Mastermind feedback matrix, encoded as
+    (pegs+1)*black + white."""
+    block, block_counts = codes_arr[start:end], counts[start:end]
+
+    # Black counts: positions where the codes agree
+    black = (block[:, None, :] == codes_arr[None, :, :]).sum(axis=2, dtype=np.int16)
+
+    # Common multiset intersection of the colors
+    common = np.minimum(block_counts[:, None, :], counts[None, :, :]).sum(axis=2, dtype=np.int16)
+    white = common - black
+
+    return (black * (pegs + 1) + white).astype(np.uint8)  # max value (pegs+1)*pegs = 20 for 4x6
+
+
+def _mastermind_feedback_matrix(codes_arr, counts, pegs, workers=1, out_dir=None):
+    """Mastermind feedback matrix, filled in row blocks that bound the
+    (rows, n, pegs) broadcast temporaries; with workers > 1 the blocks are
+    filled in a process pool."""
+    n, colors = counts.shape
+    block_fn = functools.partial(_mastermind_feedback_rows, codes_arr, counts, pegs)
+    if workers > 1:
+        return build_matrix_parallel(block_fn, (n, n), np.uint8, workers, out_dir=out_dir)
+
+    block_rows = max(1, _MASTERMIND_BLOCK_BYTES // (n * max(pegs, colors) * 2))
+    F = np.empty((n, n), dtype=np.uint8)
+    for start in range(0, n, block_rows):
+        end = min(start + block_rows, n)
+        F[start:end] = block_fn(start, end)
+    return F
+
+
+def load_mastermind(dataset_dir='data', pegs=4, colors=6, workers=1, flags=None):
     codes = list(itertools.product(range(colors), repeat=pegs))
     n = len(codes)
     names = ["".join(str(x) for x in c) for c in codes]
     codes_arr = np.array(codes, dtype=np.int8)
 
-    # Black counts: F_black[i_t, i_g] = # positions where codes agree
-    black = (codes_arr[:, None, :] == codes_arr[None, :, :]).sum(axis=2).astype(np.int16)
-
     # Per-code color counts, shape (n, colors)
     counts = np.zeros((n, colors), dtype=np.int16)
     for c in range(colors):
         counts[:, c] = (codes_arr == c).sum(axis=1)
 
-    # Common multiset intersection, shape (n, n)
-    common = np.minimum(counts[:, None, :], counts[None, :, :]).sum(axis=2).astype(np.int16)
-    white = common - black
-
     pegs_plus_1 = pegs + 1
-    F = (black * pegs_plus_1 + white).astype(np.uint8)  # max value (pegs+1)*pegs = 20 for 4x6
     base = pegs_plus_1 * pegs_plus_1  # 25 for 4x6
 
     is_target = np.ones(n, dtype=bool)
@@ -131,14 +206,16 @@ def load_mastermind(dataset_dir='data', pegs=4, colors=6):
         code = int(code)
         return (code // pegs_plus_1, code % pegs_plus_1)
 
-    return {
+    meta = {
         'G_names': names, 'T_names': names[:],
-        'F': F, 'base': base,
+        'base': base,
         'is_target': is_target,
         'targets_have_self_id': True,
         'decode_feedback': decode_feedback,
         'hard_mode_supported': False,
     }
+    build_F = functools.partial(_mastermind_feedback_matrix, codes_arr, counts, pegs, workers)
+    return GameInstance('mastermind', meta, build_F, (f"pegs={pegs}", f"colors={colors}"), flags)
 
 
 # ---------------------------------------------------------------------------
@@ -158,7 +235,7 @@ def _read_zoo_csv(path):
     return header[1:], animals, features
 
 
-def load_zoo(dataset_dir='data'):
+def load_zoo(dataset_dir='data', workers=1, flags=None):
     """Zoo instance.
 
     Targets are feature-distinct animal classes (deduplicated). Guesses are
@@ -171,6 +248,9 @@ def load_zoo(dataset_dir='data'):
     The solver's ``|T'| <= 2`` shortcut is bypassed when the shortcut would
     return a target-index that is not a valid guess (see
     ``_get_best_guess_CPU_impl`` which checks ``is_target[T[0]]``).
+
+    ``workers`` is accepted for a uniform loader signature; F is read
+    straight from the CSV and not cached.
     """
     dataset_dir = Path(dataset_dir)
     path = dataset_dir / 'zoo.csv'
@@ -188,7 +268,6 @@ def load_zoo(dataset_dir='data'):
     feats_arr = np.array(uniq_feats, dtype=np.int16)  # (n_T, n_attrs)
     n_attrs = feats_arr.shape[1]
 
-    F = feats_arr.astype(np.uint8)   # shape (n_T, n_attrs); F[t, a] = value
     max_val = int(feats_arr.max())
     base = max(2, max_val + 1)
 
@@ -200,14 +279,17 @@ def load_zoo(dataset_dir='data'):
     def decode_feedback(code):
         return (int(code),)
 
-    return {
+    meta = {
         'G_names': G_names, 'T_names': T_names,
-        'F': F, 'base': base,
+        'base': base,
         'is_target': is_target,
         'targets_have_self_id': False,
         'decode_feedback': decode_feedback,
         'hard_mode_supported': False,
     }
+    # shape (n_T, n_attrs); F[t, a] = value
+    build_F = lambda out_dir=None: feats_arr.astype(np.uint8)
+    return GameInstance('zoo', meta, build_F, None, flags)
 
 
 # ---------------------------------------------------------------------------
@@ -221,7 +303,18 @@ LOADERS = {
 }
 
 
-def load_game(game_name, dataset_dir='data'):
+def load_game(game_name, dataset_dir='data', workers=1, flags=None, **options):
+    """
+    Returns the lazy ``GameInstance`` for ``game_name``; ``options`` are
+    passed to its loader (e.g. ``targets_file`` for Wordle)
+    """
     if game_name not in LOADERS:
         raise ValueError(f"Unknown game '{game_name}'. Supported: {list(LOADERS)}")
-    return LOADERS[game_name](dataset_dir=dataset_dir)
+    return LOADERS[game_name](dataset_dir=dataset_dir, workers=workers, flags=flags, **options)
+
+
+def list_games(dataset_dir='data'):
+    """
+    Returns the lazy instances of every registered game (no matrices built)
+    """
+    return [load_game(name, dataset_dir=dataset_dir) for name in LOADERS]
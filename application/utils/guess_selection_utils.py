@@ -1,6 +1,26 @@
 from classes.guess_tree import *
 from utils.xp_utils import cp, HAS_CUPY
+from utils.jit_utils import HAS_NUMBA, RULE_IDS, partition_stats_jit
+from utils.parallel_utils import SubtreePool, SUBTREE_POOL_MIN_TARGETS
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import time
+
+
+# Budget (bytes) for one tile of the batched CPU scorer; sized for L2
+CPU_TILE_BYTES = 1 << 20
+
+# Entropy scores from the n*log2(n) table within this distance of the
+# cut-off are re-scored exactly (table rounding error is ~1e-13)
+ENTROPY_REFINE_EPS = 1e-9
+
+# Fewest guesses per chunk of the 'threads' backend; smaller G are scored
+# on the calling thread
+THREAD_MIN_GUESSES = 256
+
+# Thread count and pool of the 'threads' backend (set by _get_cpu_backends)
+_cpu_threads = 1
+_thread_pool = None
 
 
 def best_guess_functions(instance_data, flags, configs, base=243):
@@ -10,45 +30,76 @@ def best_guess_functions(instance_data, flags, configs, base=243):
     ``base`` is the per-game upper bound on feedback codes (bincount minlength);
     see utils.games for per-game values (243 for Wordle, 25 for Mastermind 4x6,
     9 for UCI Zoo).
+
+    Returns a registry {backend: get_best_guess}: 'cpu' (NumPy), 'gpu', and
+    every optional backend of ``CPU_SCORING_BACKENDS`` whose dependency is
+    installed (e.g. 'numba'), plus 'threads' with ``configs['threads']`` > 1.
     """
     targets_have_self_id = bool(configs.get('targets_have_self_id', True))
     score_rule = configs.get('score', 'PC')
 
-    def _get_best_guess_CPU(T, G, F):
-        return _get_best_guess_CPU_impl(
-            T, G, F, base=base, targets_have_self_id=targets_have_self_id,
-            score_rule=score_rule)
+    def cpu_solver(backend):
+        def _get_best_guess_CPU(T, G, F):
+            return _get_best_guess_CPU_impl(
+                T, G, F, base=base, targets_have_self_id=targets_have_self_id,
+                score_rule=score_rule, backend=backend)
+        return _get_best_guess_CPU
 
     def _get_best_guess_GPU(T, G, F):
         return _get_best_guess_GPU_impl(
             T, G, F, base=base, targets_have_self_id=targets_have_self_id,
             score_rule=score_rule)
 
-    _best_guess_functions = (_get_best_guess_CPU, _get_best_guess_GPU)
+    _best_guess_functions = {backend: cpu_solver(backend) for backend in _get_cpu_backends(configs)}
+    _best_guess_functions['gpu'] = _get_best_guess_GPU
     _best_guesses_functions = best_guesses_functions(configs, base=base)
 
-    # Subtree look-ahead wraps the avg-size rule.
-    if configs['metric']:
+    # Subtree look-ahead wraps the avg-size rule (the exact solver, metric 3,
+    # uses the greedy rule only to score candidates)
+    if configs['metric'] in (1, 2):
         instance = instance_data + (_best_guess_functions, _best_guesses_functions)
         subtree = Guess_Tree(instance, flags, configs)
 
+        # Candidate pool for CPU builds, started on first use
+        workers = configs.get('workers', 1)
+        pool = None
+        def get_pool():
+            nonlocal pool
+            if pool is None and workers > 1 and not configs['GPU']:
+                pool = SubtreePool(instance_data, flags, configs, base, workers)
+                get_best_guess_subtree.pool = pool
+            return pool
+
+        def close_pool():
+            nonlocal pool
+            if pool is not None:
+                pool.shutdown()
+                pool = get_best_guess_subtree.pool = None
+
         def get_best_guess_subtree(T, G, F):
-            return _get_best_guess_subtree(T, G, F, subtree, configs)
-        _best_guess_functions = (get_best_guess_subtree, get_best_guess_subtree)
+            return _get_best_guess_subtree(T, G, F, subtree, configs, get_pool)
+        get_best_guess_subtree.subtree = subtree
+        get_best_guess_subtree.memo = subtree.memo
+        get_best_guess_subtree.pool = None
+        get_best_guess_subtree.close_pool = close_pool
+        _best_guess_functions = {backend: get_best_guess_subtree for backend in _best_guess_functions}
 
     return _best_guess_functions
 
 
 def best_guesses_functions(configs, base=243):
-    """Top-k candidate generators for Subtree-k."""
+    """Top-k candidate generators for Subtree-k, as a registry
+    {backend: get_best_guesses} matching ``best_guess_functions``."""
     targets_have_self_id = bool(configs.get('targets_have_self_id', True))
     score_rule = configs.get('score', 'PC')
 
-    def get_best_guesses_CPU(T, G, F):
-        return _get_best_guesses_CPU(T, G, F, num_of_guesses=configs['k'],
-                                      base=base,
-                                      targets_have_self_id=targets_have_self_id,
-                                      score_rule=score_rule)
+    def cpu_solver(backend):
+        def get_best_guesses_CPU(T, G, F):
+            return _get_best_guesses_CPU(T, G, F, num_of_guesses=configs['k'],
+                                          base=base,
+                                          targets_have_self_id=targets_have_self_id,
+                                          score_rule=score_rule, backend=backend)
+        return get_best_guesses_CPU
 
     def get_best_guesses_GPU(T, G, F):
         return _get_best_guesses_GPU(T, G, F, num_of_guesses=configs['k'],
@@ -56,10 +107,12 @@ def best_guesses_functions(configs, base=243):
                                       targets_have_self_id=targets_have_self_id,
                                       score_rule=score_rule)
 
-    return (get_best_guesses_CPU, get_best_guesses_GPU)
+    _best_guesses_functions = {backend: cpu_solver(backend) for backend in _get_cpu_backends(configs)}
+    _best_guesses_functions['gpu'] = get_best_guesses_GPU
+    return _best_guesses_functions
 
 
-def _get_best_guess_CPU_impl(T, G, F, base=243, targets_have_self_id=True, score_rule='PC'):
+def _get_best_guess_CPU_impl(T, G, F, base=243, targets_have_self_id=True, score_rule='PC', backend='cpu'):
     """
     Finds the best guess by minimizing the specified score rule (CPU).
 
@@ -72,40 +125,27 @@ def _get_best_guess_CPU_impl(T, G, F, base=243, targets_have_self_id=True, score
     (animal row) carries no semantic meaning.
     ``score_rule`` specifies the scoring rule: 'PC' (Partition Count),
     'WA' (Weighted Average), or 'H' (Entropy).
+    ``backend`` names the partition-statistics kernel in
+    ``CPU_SCORING_BACKENDS``.
     """
     n = len(T)
     if n <= 2 and targets_have_self_id:
         return T[0], True
 
-    scores = np.empty(len(G), dtype=np.float64)
-    if targets_have_self_id:
-        T_set = set(T.tolist())
-    else:
-        T_set = set()
+    scores, in_T = _get_scores_CPU(T, G, F, base, targets_have_self_id, score_rule,
+                                   adjusted=False, backend=backend)
 
-    for i, g in enumerate(G):
-        g = int(g)
-        partition_sizes = np.bincount(F[T, g], minlength=base)
-        partition_sizes = partition_sizes[partition_sizes > 0]  # Keep only non-empty partitions
-        indicator = 1 if (g in T_set) else 0
-
-        if score_rule == 'PC':
-            # PC applies the indicator to the numerator (n - 1)
-            scores[i] = (n - indicator) / len(partition_sizes)
-        elif score_rule == 'WA':
-            # WA applies the indicator subtraction to the sum of squares, divided by standard n
-            scores[i] = (np.sum(partition_sizes ** 2) - indicator) / n
-        elif score_rule == 'H':
-            # Entropy MUST use standard n so probabilities sum to 1
-            probs = partition_sizes / n
-            entropy = -np.sum(probs * np.log2(probs))
-            scores[i] = -entropy
-        else:
-            raise ValueError(f"Unknown score rule: {score_rule}")
+    if score_rule == 'H':
+        # Re-score the near-ties with the per-guess formula so the pick is
+        # bit-for-bit the one of the original loop
+        cand = np.flatnonzero(scores <= scores.min() + ENTROPY_REFINE_EPS)
+        exact = _get_exact_entropy_scores_CPU(T, G[cand], F, base, np.full(len(cand), n))
+        argmin = int(cand[np.argmin(exact)])
+    else:
+        argmin = int(np.argmin(scores))
 
-    argmin = int(np.argmin(scores))
     g_star = G[argmin]
-    g_star_in_T = (int(g_star) in T_set) if targets_have_self_id else False
+    g_star_in_T = bool(in_T[argmin])
     return g_star, g_star_in_T
 
 
@@ -165,43 +205,193 @@ def _get_best_guess_GPU_impl(T, G, F, base=243, targets_have_self_id=True, score
 
 
 def _get_best_guesses_CPU(T, G, F, num_of_guesses=10, base=243,
-                          targets_have_self_id=True, score_rule='PC'):
+                          targets_have_self_id=True, score_rule='PC', backend='cpu'):
     """
     Finds the best guesses by minimizing the specified score rule (CPU).
     """
     n = len(T)
-    scores = np.empty(len(G), dtype=np.float64)
-    if targets_have_self_id:
-        T_set = set(T.tolist())
+    scores, in_T = _get_scores_CPU(T, G, F, base, targets_have_self_id, score_rule,
+                                   adjusted=True, backend=backend)
+
+    if score_rule == 'H':
+        # Re-score every guess that could reach the top-k with the
+        # per-guess formula, then rank by (exact score, index)
+        k = min(num_of_guesses, len(G))
+        kth = np.partition(scores, k - 1)[k - 1]
+        cand = np.flatnonzero(scores <= kth + ENTROPY_REFINE_EPS)
+        exact = _get_exact_entropy_scores_CPU(T, G[cand], F, base, n - in_T[cand])
+        g_star_idxs = cand[np.argsort(exact, kind='stable')[:num_of_guesses]]
     else:
-        T_set = set()
+        sorted_indices = np.argsort(scores, kind='stable')
+        g_star_idxs = sorted_indices[:num_of_guesses]
+
+    picks = G[g_star_idxs]
+    in_T = [bool(x) for x in in_T[g_star_idxs]]
+    return picks, in_T
+
 
-    for i, g in enumerate(G):
-        g = int(g)
-        partition_sizes = np.bincount(F[T, g], minlength=base)
-        partition_sizes = partition_sizes[partition_sizes > 0]
+def _iter_partition_counts_CPU(T, G, F, base):
+    """
+    Yields (start, end, counts) over tiles of G, where counts[i, c] is the
+    size of partition c induced by guess G[start + i] on T. Each tile is one
+    bincount over flattened per-guess offsets (as in the GPU kernels),
+    sized so its working set fits in L2
+    """
+    n, nG = len(T), len(G)
+    tile = max(1, CPU_TILE_BYTES // (9 * n + 8 * base))
+    offsets = np.arange(tile, dtype=np.intp) * base
+    T_col = T[:, None]
 
-        n_adjusted = (n - 1) if g in T_set else n
+    for start in range(0, nG, tile):
+        end = min(start + tile, nG)
+        w = end - start
+        global_indices = F[T_col, G[start:end]] + offsets[:w]
+        counts = np.bincount(global_indices.ravel(), minlength=w * base).reshape(w, base)
+        yield start, end, counts
 
+
+def _get_partition_stats_CPU(T, G, F, base, score_rule):
+    """
+    Per-guess partition statistic (NumPy): number of non-empty partitions
+    (PC), sum of squared sizes (WA) or sum of s*log2(s) over partitions (H)
+    """
+    nG = len(G)
+    if score_rule == 'H':
+        nlog2n = _get_nlog2n_table(len(T))
+        stat = np.empty(nG, dtype=np.float64)
+        for start, end, counts in _iter_partition_counts_CPU(T, G, F, base):
+            stat[start:end] = nlog2n[counts].sum(axis=1)
+        return stat
+
+    stat = np.empty(nG, dtype=np.int64)
+    for start, end, counts in _iter_partition_counts_CPU(T, G, F, base):
         if score_rule == 'PC':
-            scores[i] = n_adjusted / len(partition_sizes)
-        elif score_rule == 'WA':
-            scores[i] = np.sum(partition_sizes ** 2) / n_adjusted
-        elif score_rule == 'H':
-            probs = partition_sizes / n_adjusted
-            entropy = -np.sum(probs * np.log2(probs))
-            scores[i] = -entropy
+            stat[start:end] = (counts > 0).sum(axis=1)
         else:
-            raise ValueError(f"Unknown score rule: {score_rule}")
+            stat[start:end] = (counts * counts).sum(axis=1)
+    return stat
 
-    sorted_indices = np.argsort(scores, kind='stable')
-    g_star_idxs = sorted_indices[:num_of_guesses]
-    picks = G[g_star_idxs]
+
+def _get_partition_stats_JIT(T, G, F, base, score_rule):
+    """
+    Same statistics as ``_get_partition_stats_CPU`` from the compiled kernel
+    (counting and reduction in one parallel loop, no (n, |G|) temporaries).
+    PC/WA values are integers held exactly in float64
+    """
+    nlog2n = _get_nlog2n_table(len(T))
+    return partition_stats_jit(np.asarray(F), np.asarray(T, dtype=np.intp), np.asarray(G, dtype=np.intp),
+                               base, RULE_IDS[score_rule], nlog2n)
+
+
+def _get_nlog2n_table(n):
+    nlog2n = np.zeros(n + 1, dtype=np.float64)
+    nlog2n[1:] = np.arange(1, n + 1) * np.log2(np.arange(1, n + 1))
+    return nlog2n
+
+
+def _get_partition_stats_threaded(T, G, F, base, score_rule):
+    """
+    Same statistics as ``_get_partition_stats_CPU``, with G split into one
+    chunk per thread and the chunks scored concurrently (NumPy releases the
+    GIL in the gathers, bincounts and reductions of each tile). Each chunk
+    fills its own slice of the result, so the statistics, and the guesses
+    picked from them, do not depend on the thread count
+    """
+    nG = len(G)
+    chunk = max(THREAD_MIN_GUESSES, -(-nG // _cpu_threads))
+    if chunk >= nG:
+        return _get_partition_stats_CPU(T, G, F, base, score_rule)
+
+    stat = np.empty(nG, dtype=np.float64 if score_rule == 'H' else np.int64)
+    def fill(start):
+        stat[start:start + chunk] = _get_partition_stats_CPU(T, G[start:start + chunk], F, base, score_rule)
+    for _ in _thread_pool.map(fill, range(0, nG, chunk)):
+        pass
+    return stat
+
+
+# CPU partition-statistics kernels by backend name. Optional backends are
+# registered only when their dependency imports (see utils.jit_utils)
+CPU_SCORING_BACKENDS = {'cpu': _get_partition_stats_CPU, 'threads': _get_partition_stats_threaded}
+if HAS_NUMBA:
+    CPU_SCORING_BACKENDS['numba'] = _get_partition_stats_JIT
+
+
+def _get_cpu_backends(configs):
+    """
+    Returns the CPU backends to register for ``configs``: 'threads' needs
+    ``configs['threads']`` > 1, and its pool is sized here
+    """
+    global _cpu_threads, _thread_pool
+    threads = int(configs.get('threads', 1))
+    if threads <= 1:
+        return [backend for backend in CPU_SCORING_BACKENDS if backend != 'threads']
+    if threads != _cpu_threads:
+        if _thread_pool is not None:
+            _thread_pool.shutdown()
+        _cpu_threads, _thread_pool = threads, ThreadPoolExecutor(max_workers=threads)
+    return list(CPU_SCORING_BACKENDS)
+
+
+def _get_scores_CPU(T, G, F, base, targets_have_self_id, score_rule, adjusted, backend='cpu'):
+    """
+    Scores every guess in one fused pass of the ``backend`` kernel (CPU). PC
+    and WA use integer statistics only; H uses a precomputed n*log2(n) table
+    and is exact up to rounding (callers re-score near-ties, see
+    _get_exact_entropy_scores_CPU).
+
+    ``adjusted`` selects the top-k convention of ``_get_best_guesses_CPU``
+    (n_adjusted = n - 1 for guesses in T) instead of the indicator
+    convention of ``_get_best_guess_CPU_impl``.
+    Returns (scores, in_T)
+    """
+    if score_rule not in ('PC', 'WA', 'H'):
+        raise ValueError(f"Unknown score rule: {score_rule}")
+
+    n, nG = len(T), len(G)
     if targets_have_self_id:
-        in_T = [int(g) in T_set for g in picks]
+        global_mask = np.zeros(F.shape[1], dtype=bool)
+        global_mask[T] = True
+        in_T = global_mask[G]
     else:
-        in_T = [False] * len(picks)
-    return picks, in_T
+        in_T = np.zeros(nG, dtype=bool)
+    indicator = in_T.astype(np.int64)
+
+    stat = CPU_SCORING_BACKENDS[backend](T, G, F, base, score_rule)
+
+    if score_rule == 'PC':
+        # (n - indicator) / |P_g|, identical for both conventions
+        scores = (n - indicator) / stat
+    elif score_rule == 'WA':
+        scores = stat / (n - indicator) if adjusted else (stat - indicator) / n
+    else:
+        # sum_c (s_c/m) log2(s_c/m) = (sum_c s_c log2 s_c) / m - (n/m) log2 m
+        m = (n - indicator) if adjusted else np.full(nG, n, dtype=np.int64)
+        scores = stat / m - (n / m) * np.log2(m)
+
+    return scores, in_T
+
+
+def _get_exact_entropy_scores_CPU(T, G, F, base, m):
+    """
+    Entropy scores computed exactly as the original per-guess loop did
+    (sum over the non-empty partitions in code order), with probabilities
+    normalized by m[i]. Guesses with the same partition-size sequence share
+    one evaluation
+    """
+    scores = np.empty(len(G), dtype=np.float64)
+    seen = {}
+    for start, end, counts in _iter_partition_counts_CPU(T, G, F, base):
+        for i in range(start, end):
+            partition_sizes = counts[i - start]
+            partition_sizes = partition_sizes[partition_sizes > 0]
+            key = (int(m[i]), partition_sizes.tobytes())
+            if key not in seen:
+                probs = partition_sizes / int(m[i])
+                entropy = -np.sum(probs * np.log2(probs))
+                seen[key] = -entropy
+            scores[i] = seen[key]
+    return scores
 
 
 def _get_best_guesses_GPU(T, G, F, num_of_guesses=10, base=243,
@@ -246,9 +436,10 @@ def _get_best_guesses_GPU(T, G, F, num_of_guesses=10, base=243,
     return G[g_star_idxs], in_T[g_star_idxs]
 
 
-def _get_best_guess_subtree(T, G, F, subtree, configs):
+def _get_best_guess_subtree(T, G, F, subtree, configs, get_pool=None):
     """
-    Finds the best guess using a subtree metric
+    Finds the best guess using a subtree metric. ``get_pool()`` returns the
+    SubtreePool for candidate evaluation, or None to evaluate in-process
     """
     targets_have_self_id = bool(configs.get('targets_have_self_id', True))
 
@@ -256,10 +447,12 @@ def _get_best_guess_subtree(T, G, F, subtree, configs):
     if n <= 2 and targets_have_self_id:
         return T[0], True
 
-    T, G, xp, F, _, _, get_best_guesses = subtree.optimizer.get_context(T, G)
+    T, G, xp, F, _, get_best_guess, get_best_guesses = subtree.optimizer.get_context(T, G)
 
     if configs['metric'] == 1:
+        # Candidates come sorted by score, so the first one seeds the incumbent
         G_prime, candidates_in_T = get_best_guesses(T, G, F)
+        first = 0
     else:
         if targets_have_self_id:
             global_mask = xp.zeros(F.shape[1], dtype=xp.bool_)
@@ -268,23 +461,111 @@ def _get_best_guess_subtree(T, G, F, subtree, configs):
         else:
             G_prime = G
             candidates_in_T = [False] * len(G)
+        # Seed the incumbent with the greedy pick (or the representative of its class)
+        g_seed, _ = get_best_guess(T, G, F)
+        if not configs['hard_mode']:
+            G_prime, candidates_in_T, first = _get_distinct_guesses(T, G_prime, F, candidates_in_T, xp,
+                                                                    seed=g_seed)
+        else:
+            first = int(xp.flatnonzero(G_prime == g_seed)[0])
 
-    g_star, g_star_in_T = _get_best_subtree_candidate(T, G, G_prime, F, candidates_in_T, subtree)
+    pool = None
+    if get_pool is not None and isinstance(T, np.ndarray) and n >= SUBTREE_POOL_MIN_TARGETS:
+        pool = get_pool()
+
+    g_star, g_star_in_T = _get_best_subtree_candidate(T, G, G_prime, F, candidates_in_T, subtree, first,
+                                                      pool=pool)
     return g_star, g_star_in_T
 
 
-def _get_best_subtree_candidate(T, G, G_prime, F, candidates_in_T, subtree):
+def _get_distinct_guesses(T, G, F, candidates_in_T, xp=np, seed=None):
+    """
+    Collapses guesses that induce the same partition of T (same column F[T, g] up to
+    relabeling of the codes) to one representative, and drops zero-information guesses
+    (one bucket, not in T). The representative is the lowest-index in-T guess of its
+    class, else its lowest-index guess: in normal mode equivalent guesses build the same
+    subtree, and an in-T guess scores strictly better than its out-of-T equivalents
+    (one target is found at the root), so the Subtree-Full pick is unchanged.
+    Returns (G_reduced, candidates_in_T_reduced), plus, with a ``seed`` guess, the index
+    in G_reduced of the representative of its class (0 if it was dropped): the seed
+    itself may be collapsed, e.g. an out-of-T greedy pick under --score H
     """
-    Evaluates the provided candidates (G_prime) using the subtree metric and selects the best one
+    T_np = cp.asnumpy(T) if xp is not np else np.asarray(T)
+    G_np = cp.asnumpy(G) if xp is not np else np.asarray(G)
+    in_T = np.asarray(candidates_in_T, dtype=bool)
+    cols = F[T_np[:, None], G_np]
+    cols = (cp.asnumpy(cols) if xp is not np else np.asarray(cols)).T  # (|G|, n)
+    nG, n = cols.shape
+
+    # Relabel each column by the first row holding each code
+    first = np.full((nG, int(cols.max()) + 1), n, dtype=np.int16 if n < 1 << 15 else np.int32)
+    rows = np.arange(nG)
+    for i in range(n - 1, -1, -1):
+        first[rows, cols[:, i]] = i
+    labels = first[rows[:, None], cols]
+
+    informative = in_T | (labels != 0).any(axis=1)
+    if not informative.any():
+        if seed is None:
+            return G, candidates_in_T
+        return G, candidates_in_T, int(np.flatnonzero(G_np == int(seed))[0])
+
+    # In-T guesses first, each group in index order, so np.unique keeps the preferred one
+    order = np.lexsort((np.arange(nG), ~in_T))
+    order = order[informative[order]]
+    rows_sorted = labels[order]
+    # Group rows by a 64-bit fingerprint (1-D unique is far cheaper than a row-wise one)
+    # and confirm the groups, falling back to exact row comparison on a collision
+    weights = np.random.default_rng(0).integers(1, 1 << 62, size=n, dtype=np.int64)
+    fingerprints = rows_sorted.astype(np.int64) @ weights
+    _, keep, inverse = np.unique(fingerprints, return_index=True, return_inverse=True)
+    if not np.array_equal(rows_sorted, rows_sorted[keep[inverse]]):
+        _, keep, inverse = np.unique(rows_sorted, axis=0, return_index=True, return_inverse=True)
+    representatives = order[keep[inverse.ravel()]]  # per entry of order
+    keep = np.sort(order[keep])
+
+    G_reduced = G[xp.asarray(keep)] if xp is not np else G[keep]
+    if seed is None:
+        return G_reduced, in_T[keep].tolist()
+    seed_pos = np.flatnonzero(G_np[order] == int(seed))
+    seed_index = int(np.searchsorted(keep, representatives[seed_pos[0]])) if len(seed_pos) else 0
+    return G_reduced, in_T[keep].tolist(), seed_index
+
+
+def _get_best_subtree_candidate(T, G, G_prime, F, candidates_in_T, subtree, first=0, pool=None):
     """
-    subtree.T = T
-    subtree.G = G
-    scores = np.zeros(len(G_prime))
-
-    for i, g_start in enumerate(G_prime):
-        g_start_in_T = candidates_in_T[i]
-        D = subtree.build_subtree(g_start, g_start_in_T)
-        scores[i] = D.mean() + 0.001 * D.max()
+    Evaluates the provided candidates (G_prime) using the subtree metric and selects the best one.
+    Candidate ``first`` is evaluated first; the others are built under branch-and-bound
+    against the best score so far and skipped once their lower bound exceeds it, which
+    keeps the (first-index) argmin unchanged. With a ``pool``, the others are evaluated
+    in its worker processes. Past ``subtree.deadline`` (anytime builds) the remaining
+    candidates are skipped, and candidate builds give up
+    """
+    scores = np.full(len(G_prime), np.inf)
+
+    D = subtree.build_subtree(T, G, G_prime[first], candidates_in_T[first])
+    if D is None:
+        # Anytime build out of time before the seed finished: keep the seed
+        return G_prime[first], candidates_in_T[first]
+    scores[first] = D.mean() + 0.001 * D.max()
+    incumbent = scores[first]
+
+    rest = [i for i in range(len(G_prime)) if i != first]
+    if subtree.deadline is not None and time.time() > subtree.deadline:
+        rest = []  # anytime build out of time: keep the seed
+    if pool is not None and rest:
+        G_task = G if subtree.configs['hard_mode'] else None
+        scores[rest] = pool.evaluate(T, G_task, [G_prime[i] for i in rest],
+                                     [candidates_in_T[i] for i in rest], incumbent, deadline=subtree.deadline)
+    else:
+        for i in rest:
+            if subtree.deadline is not None and time.time() > subtree.deadline:
+                break
+            D = subtree.build_subtree(T, G, G_prime[i], candidates_in_T[i], bound=incumbent)
+            if D is None:
+                continue
+            scores[i] = D.mean() + 0.001 * D.max()
+            incumbent = min(incumbent, scores[i])
 
     argmin = np.argmin(scores)
     g_star = G_prime[argmin]
@@ -1,6 +1,8 @@
 from utils.guess_selection_utils import *
 from utils.xp_utils import cp, HAS_CUPY
+from utils.feedback_utils import get_feedback_matrix_vectorized, get_alphabet, get_word_length, encode_words, feedback_dtype
 from utils import games as _games
+import functools
 import numpy as np
 
 
@@ -16,23 +18,34 @@ def get_instance(flags, configs):
     game = configs.get('game', 'wordle')
     if game == 'wordle':
         return _get_instance_wordle(flags, configs)
-    elif game in ('mastermind', 'zoo'):
+    elif game in _games.LOADERS:
         return _get_instance_generic(game, flags, configs)
     else:
-        raise ValueError(f"Unknown game '{game}'. Supported: wordle, mastermind, zoo.")
+        raise ValueError(f"Unknown game '{game}'. Supported: {list(_games.LOADERS)}.")
 
 
 def _get_instance_wordle(flags, configs):
-    """Original Wordle pipeline (kept intact for reproducibility)."""
-    T = _get_words("data/solutions.txt") # Target words
-    G = T + _get_words("data/non_solutions.txt") # Guesses
-    F = _get_feedback_matrix(T, G, configs)
-    C = _get_feedback_compatibility_matrix(configs)
-    decode_feedback = decode_feedback_GPU if configs['GPU'] else decode_feedback_CPU
+    """
+    Wordle pipeline. Word length and alphabet follow the word lists
+    (``configs['targets_file']`` / ``configs['guesses_file']``), and the
+    feedback codes, bincount width and hard-mode LUT are sized by 3**L
+    """
+    game = _games.load_game('wordle', dataset_dir='data', workers=configs.get('workers', 1), flags=flags,
+                            targets_file=configs.get('targets_file'), guesses_file=configs.get('guesses_file'))
+    T = game['T_names'] # Target words
+    G = game['G_names'] # Guesses
+    L = game['word_length']
+    base = game['base']
+    F = game.get_F(build_fn=functools.partial(_get_feedback_matrix, T, G, configs))
+    if configs['GPU']:
+        F = cp.asarray(F)
+    C = _get_feedback_compatibility_matrix(configs, l=L)
+    decode_feedback = functools.partial(decode_feedback_GPU if configs['GPU'] else decode_feedback_CPU, L=L)
     instance_data = (G, T, F, C, decode_feedback)
     configs['targets_have_self_id'] = True
-    _best_guess_functions = best_guess_functions(instance_data, flags, configs, base=243)
-    _best_guesses_functions = best_guesses_functions(configs, base=243)
+    configs['base'] = base
+    _best_guess_functions = best_guess_functions(instance_data, flags, configs, base=base)
+    _best_guesses_functions = best_guesses_functions(configs, base=base)
     return instance_data + (_best_guess_functions, _best_guesses_functions)
 
 
@@ -41,10 +54,10 @@ def _get_instance_generic(game, flags, configs):
     if configs.get('hard_mode'):
         raise ValueError(f"Game '{game}' does not support hard mode.")
 
-    data = _games.load_game(game, dataset_dir='data')
+    data = _games.load_game(game, dataset_dir='data', workers=configs.get('workers', 1), flags=flags)
     G_names = data['G_names']
     T_names = data['T_names']
-    F = data['F']                    # numpy
+    F = data['F']                    # numpy (built on first access)
     base = int(data['base'])
 
     # Route everything through CPU: these games are small and don't need GPU.
@@ -54,6 +67,7 @@ def _get_instance_generic(game, flags, configs):
     # ``targets_have_self_id`` is False only for Zoo, which has no terminal
     # identification action (guesses are attributes).
     configs['targets_have_self_id'] = bool(data.get('targets_have_self_id', True))
+    configs['base'] = base
 
     decode_fn = _wrap_decode_feedback(data['decode_feedback'])
 
@@ -74,53 +88,51 @@ def _wrap_decode_feedback(decode_game):
     return decode
 
 
-def _get_words(filepath):
-    words = []
-
-    with open(filepath, 'r') as f:
-        for line in f:
-            word = line.strip()
-            words.append(word)
-
-    return words
+def _get_feedback_matrix(T, G, configs, out_dir=None):
+    """
+    Returns the T x G feedback matrix based on the GPU config. Hard mode uses
+    the same matrix; its guess-vs-guess columns are computed lazily by
+    ``GuessFeedbackColumns`` (see Guess_Tree.get_next_guesses_hardmode)
+    """
+    if configs['GPU']:
+        return _get_feedback_matrix_GPU(T, G)
+    return _get_feedback_matrix_CPU(T, G, workers=configs.get('workers', 1), out_dir=out_dir)
 
 
-def _get_feedback_matrix(T, G, configs):
+def _get_feedback_matrix_CPU(T, G, workers=1, out_dir=None):
     """
-    Returns the feedback matrix based on the GPU and hard_mode configs
+    Returns the encoded feedback matrix, where F[t, g] represents the
+    feedback pattern of target t and guess g (CPU, vectorized and tiled
+    over guess columns; row blocks run in ``workers`` processes)
     """
-    mapping = {
-        (False, False): _get_feedback_matrix_CPU,
-        (True,  False): _get_feedback_matrix_GPU,
-        (False, True):  _get_feedback_matrix_hardmode_CPU,
-        (True,  True):  _get_feedback_matrix_hardmode_GPU_batched,
-    }
-    return mapping[(configs['GPU'], configs['hard_mode'])](T, G)
+    return get_feedback_matrix_vectorized(T, G, workers=workers, out_dir=out_dir)
 
 
-def _get_feedback_matrix_CPU(T, G):
+def _get_feedback_matrix_CPU_reference(T, G):
     """
-    Returns the encoded feedback matrix, where F[t, g] represents the
-    feedback pattern of target t and guess g (CPU)
+    Reference implementation of the feedback matrix (pure Python loop over
+    targets, guesses and positions). Kept for parity checks against
+    ``_get_feedback_matrix_CPU`` (see tests/test_feedback_parity.py)
     """
     K = len(T)
     nG = len(G)
-    L = 5
-    
-    # Pre-encode words to integers (0-25) for easier indexing
-    T_int = [[ord(c) - 97 for c in w] for w in T]
-    G_int = [[ord(c) - 97 for c in w] for w in G]
-    
+    L = get_word_length(T, G)
+    alphabet = get_alphabet(T, G)
+
+    # Pre-encode words to letter indices for easier indexing
+    T_int = encode_words(T, alphabet).tolist()
+    G_int = encode_words(G, alphabet).tolist()
+
     # Initialize output matrix
     # F = Matrix of shape (T, G)
-    F = np.zeros((K, nG), dtype=np.uint8)
+    F = np.zeros((K, nG), dtype=feedback_dtype(L))
 
-    # Powers of 3 for encoding [3^4, 3^3, ..., 3^0]
+    # Powers of 3 for encoding [3^(L-1), ..., 3^0]
     powers = [3**(L-1-i) for i in range(L)]
 
     # line 1: Precompute c_t (letter counts for targets)
     # c_t[t][char] = count
-    c_t = np.zeros((K, 26), dtype=np.int8)
+    c_t = np.zeros((K, len(alphabet)), dtype=np.int8)
     for t_idx, t_word in enumerate(T_int):
         for char in t_word:
             c_t[t_idx][char] += 1
@@ -176,16 +188,18 @@ def _get_feedback_matrix_GPU(T, G):
     feedback pattern of target t and guess g (GPU)
     """
     # Create staks with encoded words
-    key_words = cp.stack([_encode_word(w) for w in T])
-    all_words = cp.stack([_encode_word(w) for w in G])
+    alphabet = get_alphabet(T, G)
+    n_letters = len(alphabet)
+    key_words = cp.asarray(encode_words(T, alphabet))
+    all_words = cp.asarray(encode_words(G, alphabet))
     
     K = key_words.shape[0]
     G = all_words.shape[0]
     L = key_words.shape[1]  # Length of each word
 
     # Compute letter counts for each target
-    flat_idx = cp.ravel(key_words) + cp.repeat(cp.arange(K), L) * 26
-    count_t = cp.bincount(flat_idx, minlength=K * 26).reshape(K, 26).astype(cp.int32)
+    flat_idx = cp.ravel(key_words) + cp.repeat(cp.arange(K), L) * n_letters
+    count_t = cp.bincount(flat_idx, minlength=K * n_letters).reshape(K, n_letters).astype(cp.int32)
 
     # Compute equality mask for greens
     equal = key_words[:, None, :] == all_words[None, :, :]
@@ -195,7 +209,7 @@ def _get_feedback_matrix_GPU(T, G):
     feedback[equal] = 2
 
     # Compute green counts per letter per pair
-    green_counts = cp.zeros((K, G, 26), dtype=cp.int32)
+    green_counts = cp.zeros((K, G, n_letters), dtype=cp.int32)
     for l in range(L):
         mask_l = equal[:, :, l]
         k, g = cp.where(mask_l)
@@ -219,30 +233,9 @@ def _get_feedback_matrix_GPU(T, G):
         remaining_counts[idx_k, idx_g, idx_c] -= cond.astype(cp.int32)
 
     # Compute the encoded feedback codes
-    powers = cp.power(3, cp.arange(L - 1, -1, -1), dtype=cp.uint8)
-    F = cp.sum(feedback * powers[None, None, :], axis=2, dtype=cp.uint8)
-    return F
-
-
-def _get_feedback_matrix_hardmode_CPU(T, G):
-    """
-    Returns the encoded feedback matrix, where F[t, g] represents the
-    feedback pattern of target t and guess g, hardmode version (CPU)
-    """
-    return _get_feedback_matrix_CPU(G, G)
-
-
-def _get_feedback_matrix_hardmode_GPU_batched(T, G, batch_size=1000):
-    """
-    Returns the encoded feedback matrix, where F[t, g] represents the
-    feedback pattern of target t and guess g, hardmode batched version (GPU)
-    """
-    nG = len(G)
-    F = cp.empty((nG, nG), dtype=cp.uint16)
-    for i in range(0, nG, batch_size):
-        end = min(i + batch_size, nG)
-        F[i:end] = _get_feedback_matrix_GPU(G[i:end], G)
-        cp._default_memory_pool.free_all_blocks()
+    dtype = feedback_dtype(L)
+    powers = cp.power(3, cp.arange(L - 1, -1, -1), dtype=dtype)
+    F = cp.sum(feedback * powers[None, None, :], axis=2, dtype=dtype)
     return F
 
 
@@ -254,29 +247,26 @@ def _get_feedback_compatibility_matrix(configs, l=5):
         return None
     
     xp = cp if configs['GPU'] else np
-    n = 243
+    n = 3 ** l
     codes = xp.arange(n, dtype=xp.int32)
     digits = ((codes[:, None] // (3 ** xp.arange(l-1, -1, -1))) % 3).astype(xp.int8)
 
-    # Compare all pairs (i, j): we want i >= j elementwise
-    C = xp.all(digits[:, None, :] >= digits[None, :, :], axis=2)
+    # Compare all pairs (i, j): we want i >= j elementwise. One digit at a
+    # time, so the temporaries are (n, n) booleans rather than (n, n, l)
+    C = xp.ones((n, n), dtype=xp.bool_)
+    for d in range(l):
+        C &= digits[:, None, d] >= digits[None, :, d]
 
     return C
 
 
-def _encode_word(word):
-    return cp.array([ord(c) - 97 for c in word], dtype=cp.int8)
-
-
-def decode_feedback_CPU(f):
+def decode_feedback_CPU(f, L=5):
     base = 3
-    L = 5
     exps = np.power(base, np.arange(L - 1, -1, -1))
     return (f // exps) % base
 
 
-def decode_feedback_GPU(f):
+def decode_feedback_GPU(f, L=5):
     base = 3
-    L = 5
     exps = cp.power(base, cp.arange(L - 1, -1, -1))
     return (f // exps) % base
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Numba compatibility shim and JIT-compiled CPU scoring kernel.
+
+Like ``xp_utils`` does for CuPy, this module makes Numba optional: if it
+is not installed, ``HAS_NUMBA`` is False, ``njit`` is a no-op decorator and
+the compiled backend is simply not registered (see
+``guess_selection_utils.CPU_SCORING_BACKENDS``), so callers fall back to the
+NumPy kernel.
+
+The kernel fuses counting and the partition statistic, the O(|T| * |G|)
+part. Turning statistics into scores and selecting the top k stay in NumPy
+(``_get_scores_CPU``), on O(|G|) vectors: every backend then shares the
+same floating-point scoring and tie-breaking, so they pick the same
+guesses.
+
+Usage:
+    from utils.jit_utils import HAS_NUMBA, partition_stats_jit
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except Exception:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+
+# Guesses per parallel tile: each tile keeps a (tile, base) count block
+# while it streams the target rows of F once
+JIT_TILE = 64
+
+# Score rule ids understood by partition_stats_jit
+RULE_IDS = {'PC': 0, 'WA': 1, 'H': 2}
+
+
+@njit(parallel=True, cache=True)
+def partition_stats_jit(F, T, G, base, rule, nlog2n):
+    """
+    Per-guess partition statistic over T in one loop: number of non-empty
+    partitions (rule 0), sum of squared sizes (rule 1) or sum of
+    s*log2(s) via the ``nlog2n`` table (rule 2). Tiles of G run in parallel
+    """
+    n = T.shape[0]
+    nG = G.shape[0]
+    n_tiles = (nG + JIT_TILE - 1) // JIT_TILE
+    out = np.empty(nG, dtype=np.float64)
+
+    for tile in prange(n_tiles):
+        start = tile * JIT_TILE
+        end = min(start + JIT_TILE, nG)
+        w = end - start
+        counts = np.zeros((w, base), dtype=np.int64)
+
+        # Stream each target row once (contiguous in F) for the whole tile
+        for i in range(n):
+            row = F[T[i]]
+            for j in range(w):
+                counts[j, row[G[start + j]]] += 1
+
+        for j in range(w):
+            stat = 0.0
+            for c in range(base):
+                s = counts[j, c]
+                if s > 0:
+                    if rule == 0:
+                        stat += 1.0
+                    elif rule == 1:
+                        stat += s * s
+                    else:
+                        stat += nlog2n[s]
+            out[start + j] = stat
+
+    return out
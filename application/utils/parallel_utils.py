@@ -0,0 +1,236 @@
+"""
+Process-pool helpers.
+
+``build_matrix_parallel`` fills a row-major matrix block-by-block in a pool
+of worker processes. The output is a single ``.npy`` file that every worker
+memory-maps read-write and fills in place, so no per-worker blocks are
+returned, pickled or concatenated. The caller gets the finished file back
+as a read-only memmap.
+
+``block_fn(start, end)`` must return rows ``start:end`` of the matrix and
+must be picklable (a module-level function, or a ``functools.partial`` of
+one).
+
+``SubtreePool`` evaluates Subtree-k candidates in a pool of worker
+processes. Each worker builds its own look-ahead Guess_Tree once, on the
+same F (memory-mapped from its ``.npy`` file when F has one), and keeps its
+own transposition table, whose hit and miss counts are returned with the
+results. A shared incumbent score lets every worker prune against the best
+candidate found so far by any of them.
+
+``build_subtrees_parallel`` builds whole subtrees of the decision tree in a
+pool of worker processes (``--parallel_build``), each with its own
+Guess_Tree running the configured metric.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import multiprocessing
+import tempfile
+import os
+import numpy as np
+
+
+# Blocks per worker: a few per worker keeps the pool balanced when blocks
+# have uneven cost
+BLOCKS_PER_WORKER = 4
+
+# Subtree-k candidate evaluation is dispatched to the pool only for nodes
+# with at least this many targets; below it a build costs less than a task
+SUBTREE_POOL_MIN_TARGETS = 32
+
+# Worker-side state, set by _init_matrix_worker
+_out = None
+_block_fn = None
+
+# Worker-side state, set by _init_subtree_worker
+_subtree = None
+_incumbent = None
+
+# Worker-side state, set by _init_build_worker
+_builder = None
+
+
+def build_matrix_parallel(block_fn, shape, dtype, workers, out_dir=None, block_rows=None):
+    """
+    Returns the matrix as a read-only memmap. If ``out_dir`` is given, the
+    backing file is left there (see cache_utils.save, which renames it into
+    place); otherwise it is a temporary file unlinked once mapped.
+    """
+    n_rows = shape[0]
+    if block_rows is None:
+        block_rows = max(1, -(-n_rows // (workers * BLOCKS_PER_WORKER)))
+    blocks = [(s, min(s + block_rows, n_rows)) for s in range(0, n_rows, block_rows)]
+
+    if out_dir is not None:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.npy', dir=out_dir)
+    os.close(fd)
+
+    try:
+        # Allocate the output file once; workers map it and write their rows
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        del out
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_matrix_worker,
+                                 initargs=(path, block_fn)) as executor:
+            for _ in executor.map(_fill_rows, blocks):
+                pass
+    except BaseException:
+        # Failed or interrupted build: do not leave a partial file behind
+        os.unlink(path)
+        raise
+
+    M = np.load(path, mmap_mode='r')
+    if out_dir is None:
+        try:
+            os.unlink(path)  # the mapping stays valid on POSIX
+        except OSError:
+            pass
+    return M
+
+
+def _init_matrix_worker(path, block_fn):
+    global _out, _block_fn
+    _out = np.load(path, mmap_mode='r+')
+    _block_fn = block_fn
+
+
+def _fill_rows(block):
+    start, end = block
+    _out[start:end] = _block_fn(start, end)
+
+
+class SubtreePool:
+    """
+    Process pool evaluating look-ahead candidates with the pure
+    ``Guess_Tree.build_subtree``. ``instance_data`` is (G, T, F, C, _) of
+    the CPU instance
+    """
+    def __init__(self, instance_data, flags, configs, base, workers):
+        G, T, F, C, _ = instance_data
+        if isinstance(F, np.memmap) and F.filename and os.path.exists(F.filename):
+            F = F.filename  # workers map the same file
+        self.workers = workers
+        # Transposition table hits and misses summed over the workers
+        self.memo_counts = [0, 0]
+        self.incumbent = multiprocessing.Value('d', float('inf'))
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_subtree_worker,
+            initargs=(G, T, F, C, flags, configs, base, self.incumbent))
+
+
+    def evaluate(self, T, G, candidates, candidates_in_T, incumbent=float('inf'), deadline=None):
+        """
+        Returns the subtree score D.mean() + 0.001 * D.max() of every
+        candidate, or inf for candidates pruned against the incumbent or
+        unfinished at ``deadline``. ``G`` is None for the full guess set
+        (normal mode)
+        """
+        with self.incumbent.get_lock():
+            self.incumbent.value = incumbent
+        tasks = [(T, G, int(g), bool(g_in_T), deadline) for g, g_in_T in zip(candidates, candidates_in_T)]
+        chunksize = max(1, len(tasks) // (self.workers * BLOCKS_PER_WORKER))
+        scores = []
+        for score, hits, misses in self.executor.map(_evaluate_candidate, tasks, chunksize=chunksize):
+            scores.append(score)
+            self.memo_counts[0] += hits
+            self.memo_counts[1] += misses
+        return scores
+
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def _init_subtree_worker(G, T, F, C, flags, configs, base, incumbent):
+    global _subtree, _incumbent
+    from utils.guess_selection_utils import best_guess_functions, best_guesses_functions
+    from classes.guess_tree import Guess_Tree
+
+    if isinstance(F, (str, os.PathLike)):
+        F = np.load(F, mmap_mode='r')
+    flags = dict(flags, print_diagnosis=False)
+    configs = dict(configs, GPU=False, workers=1)
+    greedy_configs = dict(configs, metric=0)
+
+    instance_data = (G, T, F, C, None)
+    instance = instance_data + (best_guess_functions(instance_data, flags, greedy_configs, base=base),
+                                best_guesses_functions(greedy_configs, base=base))
+    _subtree = Guess_Tree(instance, flags, configs)
+    _incumbent = incumbent
+
+
+def _memo_counts(memo):
+    return (memo.hits, memo.misses) if memo is not None else (0, 0)
+
+
+def _evaluate_candidate(task):
+    """
+    Returns (score, memo hits, memo misses) of one candidate build
+    """
+    T, G, g_start, g_start_in_T, _subtree.deadline = task
+    G = _subtree.G if G is None else G
+    hits, misses = _memo_counts(_subtree.memo)
+    D = _subtree.build_subtree(T, G, g_start, g_start_in_T, bound=_incumbent.value)
+    hits, misses = (c - c0 for c, c0 in zip(_memo_counts(_subtree.memo), (hits, misses)))
+    if D is None:
+        return float('inf'), hits, misses
+
+    score = D.mean() + 0.001 * D.max()
+    with _incumbent.get_lock():
+        if score < _incumbent.value:
+            _incumbent.value = score
+    return score, hits, misses
+
+
+def build_subtrees_parallel(instance_data, flags, configs, base, workers, tasks, on_done=None):
+    """
+    Builds the subtree of every task (T, G, depth) with
+    ``Guess_Tree.build_branch`` and returns the results in task order, with
+    the transposition table [hits, misses] summed over the workers. Tasks
+    are submitted largest first to balance the pool; ``on_done`` is called
+    with each result as it completes
+    """
+    G, T, F, C, _ = instance_data
+    if isinstance(F, np.memmap) and F.filename and os.path.exists(F.filename):
+        F = F.filename  # workers map the same file
+
+    results = [None] * len(tasks)
+    memo_counts = [0, 0]
+    order = sorted(range(len(tasks)), key=lambda i: -len(tasks[i][0]))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_build_worker,
+                             initargs=(G, T, F, C, flags, configs, base)) as executor:
+        futures = {executor.submit(_build_branch, tasks[i]): i for i in order}
+        for future in as_completed(futures):
+            result, hits, misses = future.result()
+            results[futures[future]] = result
+            memo_counts[0] += hits
+            memo_counts[1] += misses
+            if on_done is not None:
+                on_done(result)
+    return results, memo_counts
+
+
+def _init_build_worker(G, T, F, C, flags, configs, base):
+    global _builder
+    from utils.guess_selection_utils import best_guess_functions, best_guesses_functions
+    from classes.guess_tree import Guess_Tree
+
+    if isinstance(F, (str, os.PathLike)):
+        F = np.load(F, mmap_mode='r')
+    flags = dict(flags, print_diagnosis=False)
+    configs = dict(configs, GPU=False, workers=1, parallel_build=False)
+
+    instance_data = (G, T, F, C, None)
+    instance = instance_data + (best_guess_functions(instance_data, flags, configs, base=base),
+                                best_guesses_functions(configs, base=base))
+    _builder = Guess_Tree(instance, flags, configs)
+
+
+def _build_branch(task):
+    T, G, depth = task
+    memo = getattr(_builder.optimizer.solvers_cpu[0], 'memo', None)
+    hits, misses = _memo_counts(memo)
+    result = _builder.build_branch(T, G, depth)
+    hits, misses = (c - c0 for c, c0 in zip(_memo_counts(memo), (hits, misses)))
+    return result, hits, misses
@@ -0,0 +1,117 @@
+"""
+Append-only on-disk stream of a tree under construction.
+
+With ``--stream_tree``, the serial build writes every vertex to the stream
+file as it is created, instead of keeping the tree in memory. The file
+holds an 8-byte magic, then one record per vertex in id order: three
+little-endian int32 (guess, parent id, feedback code; -1 for the parent and
+code of the root). Records are buffered and flushed every
+``STREAM_FLUSH_VERTICES`` vertices or ``STREAM_FLUSH_SECONDS`` seconds,
+whichever comes first.
+
+When the build completes, an index footer is appended: the CSR child
+offsets (int64, one per vertex plus one) and child ids (int32, sorted by
+feedback code within each parent, as in CompactTree), followed by a
+trailer (vertex count, footer offset, index magic). ``read_tree_stream``
+returns the tree as a CompactTree over memory-mapped records. A file with
+no trailer comes from a build that did not finish; it is read as the
+partial tree of the vertices written so far.
+"""
+from classes.compact_tree import CompactTree
+from pathlib import Path
+import struct
+import time
+import numpy as np
+
+
+STREAM_MAGIC = b'GTSTRM01'
+INDEX_MAGIC = b'GTINDEX1'
+
+# Trailer: vertex count, offset of the index footer, INDEX_MAGIC
+TRAILER = struct.Struct('<qq8s')
+RECORD_DTYPE = np.dtype('<i4')
+RECORD_BYTES = 3 * RECORD_DTYPE.itemsize
+
+# Vertices and seconds buffered between writes
+STREAM_FLUSH_VERTICES = 4096
+STREAM_FLUSH_SECONDS = 1.0
+
+
+class TreeStreamWriter:
+    """
+    Appends the vertices of a tree to the stream file ``path``
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'wb')
+        self.file.write(STREAM_MAGIC)
+        self.buffer = []
+        self.n = 0
+        self.flush()
+
+
+    def append(self, guess, parent, code):
+        self.buffer += (guess, parent, code)
+        self.n += 1
+        if len(self.buffer) >= 3 * STREAM_FLUSH_VERTICES or time.time() >= self.flush_due:
+            self.flush()
+
+
+    def flush(self):
+        if self.buffer:
+            np.array(self.buffer, dtype=RECORD_DTYPE).tofile(self.file)
+            self.buffer = []
+        self.file.flush()
+        self.flush_due = time.time() + STREAM_FLUSH_SECONDS
+
+
+    def close(self):
+        """
+        Writes the index footer and closes the file
+        """
+        self.flush()
+        records = _map_records(self.path, self.n)
+        tree = CompactTree(records[:, 0], records[:, 1], records[:, 2])
+        footer = self.file.tell()
+        tree.child_offsets.astype('<i8').tofile(self.file)
+        tree.child_ids.astype(RECORD_DTYPE).tofile(self.file)
+        self.file.write(TRAILER.pack(self.n, footer, INDEX_MAGIC))
+        self.file.close()
+
+
+def read_tree_stream(path):
+    """
+    Returns (tree, complete): the tree of the stream file ``path`` as a
+    CompactTree over memory-mapped records, and whether the build that
+    wrote it finished. Children of an incomplete tree are indexed from the
+    records written so far
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        if f.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+            raise ValueError(f"\"{path}\" is not a tree stream file.")
+        trailer = None
+        if size >= len(STREAM_MAGIC) + TRAILER.size:
+            f.seek(size - TRAILER.size)
+            trailer = TRAILER.unpack(f.read(TRAILER.size))
+
+    if trailer is not None and trailer[2] == INDEX_MAGIC:
+        n, footer, _ = trailer
+        records = _map_records(path, n)
+        child_offsets = np.memmap(path, dtype='<i8', mode='r', offset=footer, shape=(n + 1,))
+        child_ids = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=footer + child_offsets.nbytes,
+                              shape=(max(n - 1, 0),))
+        tree = CompactTree(records[:, 0], records[:, 1], records[:, 2], index=(child_offsets, child_ids))
+        return tree, True
+
+    # Unfinished build: whole records only
+    records = _map_records(path, (size - len(STREAM_MAGIC)) // RECORD_BYTES)
+    return CompactTree(records[:, 0], records[:, 1], records[:, 2]), False
+
+
+def _map_records(path, n):
+    if n == 0:
+        return np.empty((0, 3), dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=len(STREAM_MAGIC), shape=(n, 3))
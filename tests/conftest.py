@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The application modules import each other as top-level packages (utils, classes)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'application'))
@@ -0,0 +1,52 @@
+"""
+The parallel build (``--parallel_build``) and the depth-first build order
+(``--build_order dfs``) give the same tree as the serial BFS build.
+"""
+from pathlib import Path
+from utils.instance_utils import get_instance
+from classes.guess_tree import Guess_Tree
+import numpy as np
+import pytest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _write_words(path, words):
+    path.write_text("\n".join(words) + "\n")
+    return str(path)
+
+
+def _build(tmp_path, monkeypatch, **options):
+    # A small Wordle instance: 120 targets and 60 extra guesses
+    monkeypatch.chdir(ROOT)
+    rng = np.random.default_rng(0)
+    T_all = (ROOT / 'data' / 'solutions.txt').read_text().split()
+    G_all = (ROOT / 'data' / 'non_solutions.txt').read_text().split()
+    flags = {'print_diagnosis': False, 'use_cache': False, 'evaluate': False, 'save_tree': False}
+    configs = {
+        'GPU': False, 'cpu_backend': 'numpy', 'threads': 1, 'workers': 1, 'parallel_build': False,
+        'game': 'wordle',
+        'targets_file': _write_words(tmp_path / 'targets.txt', list(rng.choice(T_all, 120, replace=False))),
+        'guesses_file': _write_words(tmp_path / 'guesses.txt', list(rng.choice(G_all, 60, replace=False))),
+        'hard_mode': False, 'metric': 1, 'opener': None, 'k': 3, 'horizon': 0, 'time_budget': None,
+        'build_order': 'bfs', 'stream_tree': False, 'checkpoint_every': 0, 'resume': False,
+        'memo_bytes': 16 << 20, 'score': 'PC',
+    }
+    configs.update(options)
+    instance = get_instance(flags, configs)
+    tree, D, _ = Guess_Tree(instance, flags, configs).build_tree()
+    return tree.to_dict(), np.asarray(D).tolist()
+
+
+def test_parallel_build_matches_serial(tmp_path, monkeypatch):
+    serial = _build(tmp_path, monkeypatch)
+    parallel = _build(tmp_path, monkeypatch, parallel_build=True, workers=2)
+    assert parallel == serial
+
+
+@pytest.mark.parametrize("hard_mode", [False, True])
+def test_dfs_build_matches_bfs(tmp_path, monkeypatch, hard_mode):
+    bfs = _build(tmp_path, monkeypatch, hard_mode=hard_mode)
+    dfs = _build(tmp_path, monkeypatch, hard_mode=hard_mode, build_order='dfs')
+    assert dfs == bfs
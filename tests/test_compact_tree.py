@@ -0,0 +1,63 @@
+"""
+CompactTree conversions and child lookups.
+"""
+from classes.compact_tree import CompactTree, LEAF_SENTINEL
+from utils.instance_utils import decode_feedback_CPU
+import io
+import json
+import numpy as np
+
+
+# root 0 --(4)--> 1 --(0)--> 3
+#        --(2)--> 2 --(7)--> 4 (pure leaf)
+#                   --(1)--> 5
+TREE = {
+    'root': 0,
+    'vertices': [(0, 10), (1, 11), (2, 12), (3, 13), (4, LEAF_SENTINEL), (5, 15)],
+    'successors': {(0, 4): 1, (0, 2): 2, (1, 0): 3, (2, 7): 4, (2, 1): 5},
+}
+
+
+def test_dict_round_trip():
+    tree = CompactTree.from_dict(TREE)
+    assert len(tree) == 6
+    assert tree.to_dict() == TREE
+    np.testing.assert_array_equal(tree.parents, [-1, 0, 0, 1, 2, 2])
+    np.testing.assert_array_equal(tree.codes, [-1, 4, 2, 0, 7, 1])
+
+    # Children sorted by code
+    codes, ids = tree.children(2)
+    np.testing.assert_array_equal(codes, [1, 7])
+    np.testing.assert_array_equal(ids, [5, 4])
+    assert tree.child(0, 2) == 2 and tree.child(0, 3) == -1
+
+
+def test_child_many():
+    tree = CompactTree.from_dict(TREE)
+    vs = np.array([0, 0, 0, 1, 1, 2, 2, 2, 3])
+    codes = np.array([4, 2, 3, 0, 8, 7, 1, 0, 0])
+    expected = [tree.child(v, c) for v, c in zip(vs, codes)]
+    assert expected == [1, 2, -1, 3, -1, 4, 5, -1, -1]
+    np.testing.assert_array_equal(tree.child_many(vs, codes), expected)
+
+    # A code past the largest one must not alias an edge of the next vertex
+    np.testing.assert_array_equal(tree.child_many([1], [8 + 7]), [-1])
+    np.testing.assert_array_equal(CompactTree([10], [-1], [-1]).child_many([0], [0]), [-1])
+
+
+def test_from_decoded():
+    words = [f"w{i:04d}" for i in range(16)]
+    # Codes of 5-letter Wordle feedback (base 243)
+    tree = CompactTree([10, 11, 12, 13, LEAF_SENTINEL, 15], [-1, 0, 0, 1, 2, 2], [-1, 242, 2, 0, 7, 81])
+
+    # Parsed from the saved JSON text, as written by Results.save
+    f = io.StringIO()
+    tree.write_decoded(f, words, decode_feedback_CPU)
+    decoded = json.loads(f.getvalue())
+    assert decoded['vertices'][4] == [4, None]
+
+    loaded = CompactTree.from_decoded(decoded, words, decode_feedback_CPU, 243)
+    np.testing.assert_array_equal(loaded.guesses, tree.guesses)
+    np.testing.assert_array_equal(loaded.parents, tree.parents)
+    np.testing.assert_array_equal(loaded.codes, tree.codes)
+    assert loaded.child(2, 81) == 5
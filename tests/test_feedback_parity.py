@@ -0,0 +1,72 @@
+"""
+Parity of the vectorized feedback-matrix builder with the pure-Python
+reference (``_get_feedback_matrix_CPU_reference``).
+"""
+from pathlib import Path
+from utils.feedback_utils import get_feedback_matrix_vectorized, GuessFeedbackColumns
+from utils.instance_utils import _get_feedback_matrix_CPU_reference
+import numpy as np
+import pytest
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
+
+
+def _read_words(name):
+    return [w.strip() for w in (DATA_DIR / name).read_text().split() if w.strip()]
+
+
+def _random_words(rng, n, L, alphabet):
+    # A small alphabet forces plenty of repeated letters
+    return ["".join(rng.choice(list(alphabet), size=L)) for _ in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_wordle_subsets(seed):
+    rng = np.random.default_rng(seed)
+    T_all, G_all = _read_words('solutions.txt'), _read_words('non_solutions.txt')
+    T = list(rng.choice(T_all, size=60, replace=False))
+    G = T + list(rng.choice(G_all, size=90, replace=False))
+    # Words with duplicate letters, as targets and as guesses
+    duplicates = [w for w in T_all + G_all if len(set(w)) < len(w)]
+    T += list(rng.choice(duplicates, size=20, replace=False))
+    G += list(rng.choice(duplicates, size=20, replace=False))
+
+    F_ref = _get_feedback_matrix_CPU_reference(T, G)
+    F = get_feedback_matrix_vectorized(T, G, block_cols=7)
+    assert F.dtype == F_ref.dtype
+    np.testing.assert_array_equal(F, F_ref)
+
+
+@pytest.mark.parametrize("L, alphabet", [(4, "abc"), (6, "abcd"), (7, "ab"), (5, "äöüß")])
+def test_word_length_and_alphabet_variants(L, alphabet):
+    rng = np.random.default_rng(L)
+    T = _random_words(rng, 40, L, alphabet)
+    G = T + _random_words(rng, 40, L, alphabet)
+
+    F_ref = _get_feedback_matrix_CPU_reference(T, G)
+    F = get_feedback_matrix_vectorized(T, G, block_cols=5)
+    assert F.dtype == F_ref.dtype
+    np.testing.assert_array_equal(F, F_ref)
+
+
+def test_parallel_builder(tmp_path):
+    rng = np.random.default_rng(0)
+    T = _random_words(rng, 50, 5, "abcde")
+    G = _random_words(rng, 70, 5, "abcdef")
+
+    F = get_feedback_matrix_vectorized(T, G, workers=2, out_dir=tmp_path)
+    np.testing.assert_array_equal(F, _get_feedback_matrix_CPU_reference(T, G))
+
+
+def test_guess_feedback_columns():
+    rng = np.random.default_rng(0)
+    G = _random_words(rng, 50, 5, "abcd")
+
+    F_GG = _get_feedback_matrix_CPU_reference(G, G)
+    columns = GuessFeedbackColumns(G)
+    for g in rng.choice(len(G), size=10, replace=False):
+        np.testing.assert_array_equal(columns.column(int(g)), F_GG[:, g])
+
+    targets, guesses = rng.integers(0, len(G), size=(2, 200))
+    np.testing.assert_array_equal(columns.pairs(targets, guesses), F_GG[targets, guesses])
@@ -0,0 +1,34 @@
+"""
+Tree evaluation (``Results``): the hard-mode validity check.
+"""
+from classes.compact_tree import CompactTree
+from classes.results import Results
+from utils.instance_utils import _get_feedback_matrix_CPU_reference, _get_feedback_compatibility_matrix
+import numpy as np
+
+
+WORDS = ['crane', 'trace', 'slate', 'zzzzz']
+
+
+def _results():
+    configs = {'GPU': False, 'hard_mode': True, 'targets_have_self_id': True}
+    F = _get_feedback_matrix_CPU_reference(WORDS, WORDS)
+    C = _get_feedback_compatibility_matrix(configs, l=5)
+    instance = (WORDS, WORDS, F, C, None, None, None)
+    return Results(instance, {'evaluate': True}, configs), F
+
+
+def test_check_hard_mode():
+    results, F = _results()
+    crane, trace, slate, zzzzz = range(4)
+    # crane, then trace (consistent) or zzzzz, which drops the greens of
+    # crane on slate; slate after zzzzz is consistent with both guesses above it
+    guesses = [crane, trace, zzzzz, slate]
+    parents = [-1, 0, 0, 2]
+    codes = [-1, F[trace, crane], F[slate, crane], F[slate, zzzzz]]
+    results.set_data(CompactTree(guesses, parents, codes), 0)
+    assert results._check_hard_mode() == [2]
+
+    guesses[2] = slate
+    results.set_data(CompactTree(guesses[:3], parents[:3], codes[:3]), 0)
+    assert results._check_hard_mode() == []
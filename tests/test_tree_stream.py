@@ -0,0 +1,44 @@
+"""
+Reading tree stream files (``utils.tree_stream_utils``), complete and
+truncated.
+"""
+from utils.tree_stream_utils import TreeStreamWriter, read_tree_stream, RECORD_BYTES
+import numpy as np
+
+
+# (guess, parent, code) per vertex, in id order
+RECORDS = [(10, -1, -1), (11, 0, 4), (12, 0, 2), (13, 1, 0), (14, 2, 7), (15, 2, 1)]
+
+
+def _write(path, records, close=True):
+    writer = TreeStreamWriter(path)
+    for record in records:
+        writer.append(*record)
+    if close:
+        writer.close()
+    else:
+        writer.flush()
+        writer.file.close()
+
+
+def test_complete_stream(tmp_path):
+    path = tmp_path / 'tree.stream'
+    _write(path, RECORDS)
+    tree, complete = read_tree_stream(path)
+    assert complete
+    np.testing.assert_array_equal(tree.guesses, [r[0] for r in RECORDS])
+    assert tree.child(2, 1) == 5 and tree.child(2, 7) == 4 and tree.child(1, 4) == -1
+
+
+def test_truncated_stream(tmp_path):
+    # A build killed after the flush of five vertices, mid-way through a sixth record
+    path = tmp_path / 'tree.stream'
+    _write(path, RECORDS[:5], close=False)
+    with open(path, 'ab') as f:
+        f.write(b'\0' * (RECORD_BYTES - 1))
+
+    tree, complete = read_tree_stream(path)
+    assert not complete
+    assert len(tree) == 5
+    np.testing.assert_array_equal(tree.parents, [r[1] for r in RECORDS[:5]])
+    assert tree.child(0, 4) == 1 and tree.child(2, 7) == 4 and tree.child(2, 1) == -1